@@ -0,0 +1,251 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import main
+
+# -----------------------------------------------------------
+# Бенчмарк линейного и генетического алгоритмов
+#
+#   python bench.py                       -- стандартная сетка
+#   python bench.py --quick               -- маленькая сетка для проверки
+#   python bench.py --output new.jsonl --compare old.jsonl
+#
+# Каждая строка результата -- JSON с параметрами случая, временем
+# (лучшее из --repeat запусков), пиковой памятью (отдельный запуск под
+# tracemalloc), объёмом работы в секунду (рейсы, для run_genetic --
+# оценённые особи) и достигнутым фитнесом.
+# -----------------------------------------------------------
+
+BASE_DATE = "2024-01-01"
+
+DEFAULT_GRID = {
+    "buses":       [5, 20, 100],
+    "drivers":     [12, 60, 300],
+    "pop_size":    [15, 100],
+    "generations": [20, 50],
+}
+QUICK_GRID = {
+    "buses":       [5, 20],
+    "drivers":     [12, 60],
+    "pop_size":    [15],
+    "generations": [5],
+}
+
+def parse_list(value):
+    return [int(x) for x in value.split(",") if x.strip()]
+
+def git_commit():
+    try:
+        # Коммит репозитория с бенчмарком, а не текущего каталога
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def measure(fn, repeat, seed, setup=None):
+    # fn() -> (объём, fitness); с setup -- fn(setup()), и подготовка в
+    # замер не входит. Объём -- в единицах fn.unit (по умолчанию рейсы).
+    # Время -- лучшее из repeat запусков, память -- ещё один запуск под
+    # tracemalloc (он замедляет код).
+    best = None
+    result = None
+    for _ in range(repeat):
+        random.seed(seed)
+        args = () if setup is None else (setup(),)
+        t0 = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+
+    random.seed(seed)
+    args = () if setup is None else (setup(),)
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    volume, fitness = result
+    unit = getattr(fn, "unit", "routes")
+    return {
+        "wall_time": best,
+        "peak_memory": peak,
+        unit: volume,
+        unit + "_per_sec": volume / best if best > 0 else None,
+        "fitness": fitness,
+    }
+
+# -----------------------------------------------------------
+# Случаи
+# -----------------------------------------------------------
+
+def bench_linear(buses, drivers):
+    def fn():
+        sched = main.generate_linear_schedule_week(BASE_DATE, buses, drivers)
+        return len(sched), main.evaluate_schedule(sched)
+    return fn
+
+def bench_valid_week(buses, drivers):
+    def fn():
+        sched = main.valid_week_schedule(BASE_DATE, buses, drivers)
+        return len(sched), main.evaluate_schedule(sched)
+    return fn
+
+def make_population(buses, drivers, size, seed):
+    random.seed(seed)
+    return [main.valid_week_schedule(BASE_DATE, buses, drivers) for _ in range(size)]
+
+def bench_evaluate(buses, drivers, pop_size, seed):
+    population = make_population(buses, drivers, pop_size, seed)
+    def fn():
+        total = 0
+        for ind in population:
+            ind.fitness = None   # без кэша
+            main.evaluate_schedule(ind)
+            total += len(ind)
+        return total, max(main.evaluate_schedule(ind) for ind in population)
+    return fn
+
+def bench_crossover(buses, drivers, pop_size, seed):
+    population = make_population(buses, drivers, pop_size, seed)
+    def fn():
+        total = 0
+        for p1, p2 in zip(population, population[1:] + population[:1]):
+            total += len(main.crossover(p1, p2))
+        return total, None
+    return fn
+
+def bench_mutate(buses, drivers, pop_size, seed):
+    # mutate меняет особь на месте, поэтому копии строятся заново перед
+    # каждым запуском, вне замера
+    population = make_population(buses, drivers, pop_size, seed)
+    def setup():
+        return [main.Schedule(ind.base_date, ind.days,
+                              **{name: col.copy() for name, col in ind.columns().items()})
+                for ind in population]
+    def fn(children):
+        for child in children:
+            main.mutate(child, buses, drivers, mutation_rate=1.0)
+        return sum(len(child) for child in children), None
+    fn.setup = setup
+    return fn
+
+def bench_run_genetic(buses, drivers, pop_size, generations):
+    # Объём -- оценённые особи (начальная популяция и потомки всех
+    # поколений, elite=0): рейсы в секунду с другими случаями несравнимы
+    def fn():
+        best = main.run_genetic(BASE_DATE, buses, drivers, pop_size, generations)
+        return pop_size * (generations + 1), main.evaluate_schedule(best)
+    fn.unit = "individuals"
+    return fn
+
+def iter_cases(grid, seed):
+    # (case, params, make_fn): популяции строятся только для выбранных
+    # случаев. Значения циклов привязаны аргументами по умолчанию, так
+    # что make_fn можно вызвать и после того, как генератор ушёл дальше.
+    for buses, drivers in itertools.product(grid["buses"], grid["drivers"]):
+        params = {"buses": buses, "drivers": drivers}
+        yield ("generate_linear_schedule_week", params,
+               lambda b=buses, d=drivers: bench_linear(b, d))
+        yield ("generate_valid_week", params,
+               lambda b=buses, d=drivers: bench_valid_week(b, d))
+        for pop_size in grid["pop_size"]:
+            params = {"buses": buses, "drivers": drivers, "pop_size": pop_size}
+            yield ("evaluate_schedule", params,
+                   lambda b=buses, d=drivers, p=pop_size: bench_evaluate(b, d, p, seed))
+            yield ("crossover", params,
+                   lambda b=buses, d=drivers, p=pop_size: bench_crossover(b, d, p, seed))
+            yield ("mutate", params,
+                   lambda b=buses, d=drivers, p=pop_size: bench_mutate(b, d, p, seed))
+            for generations in grid["generations"]:
+                params = {"buses": buses, "drivers": drivers,
+                          "pop_size": pop_size, "generations": generations}
+                yield ("run_genetic", params,
+                       lambda b=buses, d=drivers, p=pop_size, g=generations:
+                           bench_run_genetic(b, d, p, g))
+
+# -----------------------------------------------------------
+# Сравнение с прошлым прогоном
+# -----------------------------------------------------------
+
+def case_key(result):
+    return (result["case"], json.dumps(result["params"], sort_keys=True))
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return {case_key(r): r for r in map(json.loads, f) if "case" in r}
+
+def print_comparison(old, new):
+    print(f"{'case':32} {'params':48} {'old, s':>10} {'new, s':>10} {'x':>7}")
+    for key, r in new.items():
+        o = old.get(key)
+        if o is None:
+            continue
+        ratio = o["wall_time"] / r["wall_time"] if r["wall_time"] else float("inf")
+        print(f"{key[0]:32} {key[1]:48} {o['wall_time']:10.4f} "
+              f"{r['wall_time']:10.4f} {ratio:7.2f}")
+
+# -----------------------------------------------------------
+# Точка входа
+# -----------------------------------------------------------
+
+def main_bench(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк алгоритмов расписания")
+    parser.add_argument("--quick", action="store_true", help="маленькая сетка")
+    parser.add_argument("--buses", type=parse_list)
+    parser.add_argument("--drivers", type=parse_list)
+    parser.add_argument("--pop-size", type=parse_list)
+    parser.add_argument("--generations", type=parse_list)
+    parser.add_argument("--cases", default=None,
+                        help="через запятую: generate_linear_schedule_week,run_genetic,...")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="JSON Lines (по умолчанию stdout)")
+    parser.add_argument("--compare", default=None, help="прошлый файл результатов")
+    args = parser.parse_args(argv)
+
+    grid = dict(QUICK_GRID if args.quick else DEFAULT_GRID)
+    for name in grid:
+        value = getattr(args, name)
+        if value:
+            grid[name] = value
+    only = set(args.cases.split(",")) if args.cases else None
+
+    meta = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+    }
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    results = {}
+    try:
+        out.write(json.dumps({"meta": meta}) + "\n")
+        for case, params, make_fn in iter_cases(grid, args.seed):
+            if only is not None and case not in only:
+                continue
+            fn = make_fn()
+            result = {"case": case, "params": params,
+                      **measure(fn, args.repeat, args.seed, getattr(fn, "setup", None))}
+            results[case_key(result)] = result
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if args.compare:
+        print_comparison(load_results(args.compare), results)
+
+if __name__ == "__main__":
+    main_bench()
@@ -1,8 +1,25 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
+import argparse
+import bisect
+import cProfile
+import csv
+import hashlib
+import heapq
+import io
+import itertools
+import json
+import os
+import pstats
+import queue
 import random
-import pandas as pd
+import sys
+import threading
+import time
+import tracemalloc
+import numpy as np
 from datetime import datetime, timedelta
+from collections import OrderedDict, deque, namedtuple
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 
 # -----------------------------------------------------------
 # Глобальные настройки и параметры
@@ -18,6 +35,8 @@ SHIFT_START_HOUR = 6
 SHIFT_END_HOUR   = 3
 ROUTE_MIN = 50
 ROUTE_MAX = 70
+# Сколько рейсов пытается поставить generate_valid_day за день
+VALID_DAY_ROUTES = (20, 40)
 
 WORK_HOURS_A = 8
 WORK_HOURS_B = 12
@@ -26,15 +45,33 @@ BREAK_INTERVAL_B = timedelta(hours=2)
 SHORT_BREAK_B_RANGE = (15, 20)
 LONG_BREAK_B = 40
 
+BUS_TURNAROUND = 15   # минут между рейсами одного автобуса
+BUS_RETRY_STEP = 10   # сдвиг автобуса, если свободного водителя нет
+
 PEAK_INTERVALS = [(7,9), (17,19)]  # будни (day_idx=0..4)
 MUTATION_RATE = 0.2
+REPAIR_ATTEMPTS = 8   # сколько раз мутация перетягивает водителя/автобус
 
 # -----------------------------------------------------------
 # Вспомогательные функции
 # -----------------------------------------------------------
 
+# Внутри генераторов время хранится целым числом минут от начала
+# смены (SHIFT_START_HOUR:00). В строки "Date"/"Start"/"End"
+# переводим только при выгрузке (rows_to_records).
+DAY_MINUTES = 21 * 60   # до 03:00 следующего дня => 21 час после 06:00
+LUNCH_MINUTES_A = int(LUNCH_TIME_A.total_seconds() // 60)
+BREAK_MINUTES_B = int(BREAK_INTERVAL_B.total_seconds() // 60)
+
+# Строка внутреннего расписания:
+# (DayIdx, StartMin, EndMin, Bus ID, Driver ID, DriverType, IsPeak)
+ROW_DAY, ROW_START, ROW_END, ROW_BUS, ROW_DRIVER, ROW_TYPE, ROW_PEAK = range(7)
+
+_HHMM = [f"{m // 60:02d}:{m % 60:02d}" for m in range(24 * 60)]
+
 def is_weekday(day_idx):
-    return day_idx < 5
+    # Горизонт может быть длиннее недели: день 7 -- снова понедельник
+    return day_idx % 7 < 5
 
 def is_peak_hour(dt: datetime, day_idx: int):
     if not is_weekday(day_idx):
@@ -45,8 +82,74 @@ def is_peak_hour(dt: datetime, day_idx: int):
             return True
     return False
 
-def random_route_duration():
-    return timedelta(minutes=random.randint(ROUTE_MIN, ROUTE_MAX))
+@lru_cache(maxsize=None)
+def _peak_table(weekday, intervals, shift_start_hour):
+    # +1: рейс может начаться ровно в конце смены (day_end)
+    table = bytearray(DAY_MINUTES + 1)
+    if weekday:
+        for m in range(DAY_MINUTES + 1):
+            h = (shift_start_hour * 60 + m) // 60 % 24
+            for (start_h, end_h) in intervals:
+                if start_h <= h < end_h:
+                    table[m] = 1
+                    break
+    return bytes(table)
+
+def peak_minutes(day_idx):
+    # Таблица "минута от начала смены -> час пик" для дня day_idx
+    return _peak_table(is_weekday(day_idx), tuple(PEAK_INTERVALS), SHIFT_START_HOUR)
+
+def to_minutes(td: timedelta) -> int:
+    return int(td.total_seconds() // 60)
+
+def clock_minute(minute):
+    # Минута от начала смены -> минута суток (для сортировки как по "Start")
+    return (SHIFT_START_HOUR * 60 + minute) % (24 * 60)
+
+def random_route_minutes(rng=random):
+    return rng.randint(ROUTE_MIN, ROUTE_MAX)
+
+def random_route_duration(rng=random):
+    return timedelta(minutes=random_route_minutes(rng))
+
+class RouteSampler:
+    # Длительности рейсов и коротких перерывов B на день, вытянутые
+    # заранее одной пачкой из numpy-генератора (вместо randint на каждый
+    # рейс). Генератор засевается одним числом из rng, так что день
+    # по-прежнему целиком определяется своим потоком. Размеры пачек --
+    # верхние оценки на день; если их всё же не хватит, тянем ещё столько же.
+    def __init__(self, rng, max_routes, max_breaks):
+        self.gen = np.random.default_rng(rng.getrandbits(64))
+        self.route_batch = max(1, max_routes)
+        self.break_batch = max(1, max_breaks)
+        self.routes = []
+        self.breaks = []
+
+    def route_minutes(self):
+        if not self.routes:
+            self.routes = self.gen.integers(ROUTE_MIN, ROUTE_MAX, self.route_batch,
+                                            endpoint=True).tolist()
+        return self.routes.pop()
+
+    def short_break(self):
+        if not self.breaks:
+            self.breaks = self.gen.integers(*SHORT_BREAK_B_RANGE, self.break_batch,
+                                            endpoint=True).tolist()
+        return self.breaks.pop()
+
+def max_attempts_per_bus():
+    # Каждая попытка сдвигает автобус минимум на BUS_RETRY_STEP
+    # (неудача) или на рейс с разворотом
+    step = min(BUS_RETRY_STEP, ROUTE_MIN + BUS_TURNAROUND)
+    return DAY_MINUTES // step + 1
+
+def max_breaks_per_driver():
+    # Перерыв B не раньше чем через BREAK_INTERVAL_B после прошлого
+    return DAY_MINUTES // BREAK_MINUTES_B + 1
+
+def count_type_b(num_drivers):
+    # Нечётные id -- тип B
+    return (num_drivers + 1) // 2
 
 def get_day_start(base_date: datetime, day_idx: int) -> datetime:
     d = base_date + timedelta(days=day_idx)
@@ -54,279 +157,338 @@ def get_day_start(base_date: datetime, day_idx: int) -> datetime:
 
 def get_day_end(base_date: datetime, day_idx: int) -> datetime:
     day_start = get_day_start(base_date, day_idx)
-    # до 03:00 следующего дня => 21 час после 06:00
-    return day_start + timedelta(hours=21)
+    return day_start + timedelta(minutes=DAY_MINUTES)
+
+def rows_to_records(rows, base_date: datetime):
+    # Внутренние строки -> записи в формате CSV ("Date", "Start", ...)
+    dates = {}
+    records = []
+    for (day_idx, start, end, bus_id, driver_id, d_type, peak) in rows:
+        day_dates = dates.get(day_idx)
+        if day_dates is None:
+            d = base_date + timedelta(days=day_idx)
+            day_dates = (d.strftime("%Y-%m-%d"),
+                         (d + timedelta(days=1)).strftime("%Y-%m-%d"))
+            dates[day_idx] = day_dates
+        start_clock = SHIFT_START_HOUR * 60 + start
+        records.append({
+            "DayIdx": day_idx,
+            "Date":   day_dates[start_clock >= 24 * 60],
+            "Start":  _HHMM[start_clock % (24 * 60)],
+            "End":    _HHMM[(SHIFT_START_HOUR * 60 + end) % (24 * 60)],
+            "Bus ID": bus_id,
+            "Driver ID": driver_id,
+            "DriverType": d_type,
+            "Duration": end - start,
+            "IsPeak": bool(peak)
+        })
+    return records
+
+def sort_day_rows(rows):
+    # Как прежняя сортировка дня по строке "Start": рейсы после
+    # полуночи оказываются в начале списка
+    rows.sort(key=lambda r: clock_minute(r[ROW_START]))
+
+def sort_week_rows(rows):
+    # Как прежняя сортировка по (DayIdx, Date, Start): внутри дня
+    # "Date" меняется после полуночи, т.е. это порядок по минутам смены
+    rows.sort(key=lambda r: (r[ROW_DAY], r[ROW_START]))
 
 # -----------------------------------------------------------
-# Классы для линейного алгоритма
+# Водители и автобусы (общие для линейного алгоритма и ГА)
 # -----------------------------------------------------------
 
 class Driver:
-    def __init__(self, driver_id, driver_type):
+    __slots__ = ("driver_id", "driver_type", "limit_min", "worked",
+                 "next_free_time", "last_break_time", "long_break_used")
+
+    def __init__(self, driver_id, driver_type=None):
         self.driver_id = driver_id
-        self.driver_type = driver_type
-        if driver_type == DRIVER_TYPE_A:
-            self.work_limit = WORK_HOURS_A
+        self.driver_type = driver_type or driver_type_of(driver_id)
+        if self.driver_type == DRIVER_TYPE_A:
+            self.limit_min = WORK_HOURS_A * 60
         else:
-            self.work_limit = WORK_HOURS_B
-        self.worked = timedelta(0)
-        self.next_free_time = None
-        self.last_break_time = None
+            self.limit_min = WORK_HOURS_B * 60
+        self.reset()
+
+    def reset(self):
+        # Всё время -- в минутах от начала смены
+        self.worked = 0
+        self.next_free_time = 0
+        self.last_break_time = 0
         self.long_break_used = False
 
     def can_work_this_day(self, day_idx):
-        if self.driver_type == DRIVER_TYPE_A:
-            return True
-        else:
-            # B: 1 день работы / 2 выходных
-            return (day_idx % 3) == (self.driver_id % 3)
+        return driver_can_work(self.driver_id, day_idx)
 
-    def can_take_route(self, start_dt, dur):
-        if self.next_free_time and start_dt < self.next_free_time:
+    def can_take_route(self, start_min, dur):
+        if start_min < self.next_free_time:
             return False
-        if self.worked + dur > timedelta(hours=self.work_limit):
+        if self.worked + dur > self.limit_min:
             return False
         return True
 
+    def rest_before(self, start_min, peak, sampler):
+        # Обед A / перерыв B перед рейсом с start_min, если он положен.
+        # Возвращает минуту, с которой водитель готов к рейсу (>= start_min),
+        # или -1, если сейчас он рейс взять не может.
+        if self.driver_type == DRIVER_TYPE_A:
+            # A: обед, когда отработано от 4 до 5 часов
+            if 240 <= self.worked < 300:
+                if peak[start_min]:
+                    return -1
+                lunch_end = max(self.next_free_time, start_min) + LUNCH_MINUTES_A
+                if lunch_end > DAY_MINUTES:
+                    return -1
+                self.worked += LUNCH_MINUTES_A
+                self.next_free_time = lunch_end
+                if lunch_end > start_min:
+                    start_min = lunch_end
+        elif start_min - self.last_break_time >= BREAK_MINUTES_B:
+            # B: перерыв каждые BREAK_INTERVAL_B, первый -- длинный
+            if not self.long_break_used:
+                br_len = LONG_BREAK_B
+                self.long_break_used = True
+            else:
+                br_len = sampler.short_break()
+            br_end = max(self.next_free_time, start_min) + br_len
+            if br_end > DAY_MINUTES:
+                return -1
+            self.worked += br_len
+            self.next_free_time = br_end
+            self.last_break_time = br_end
+            if br_end > start_min:
+                start_min = br_end
+        return start_min
+
+# Прежнее имя класса водителя в ГА
+GaDriver = Driver
+
 class Bus:
+    __slots__ = ("bus_id", "next_free_time")
+
     def __init__(self, bus_id):
         self.bus_id = bus_id
-        self.next_free_time = None
+        self.next_free_time = 0
+
+class Fleet:
+    # Автобусы и водители одного размера парка. Объекты создаются один
+    # раз и перед каждым днём сбрасываются, а не создаются заново.
+    def __init__(self, num_buses, num_drivers):
+        self.buses = [Bus(b_id) for b_id in range(1, num_buses+1)]
+        self.drivers = [Driver(d_id) for d_id in range(1, num_drivers+1)]
+
+    def reset(self):
+        # (автобусы, водители) в исходном состоянии; список водителей --
+        # новый и по порядку id, его можно перемешивать
+        for bus in self.buses:
+            bus.next_free_time = 0
+        for drv in self.drivers:
+            drv.reset()
+        return self.buses, list(self.drivers)
+
+_fleets = threading.local()
+MAX_CACHED_FLEETS = 16
+
+def day_fleet(num_buses, num_drivers):
+    # Сброшенный парк для очередного дня. Парки свои у каждого потока
+    # (GUI считает в фоновом потоке), в потоке одновременно строится один день.
+    fleets = getattr(_fleets, "by_size", None)
+    if fleets is None:
+        fleets = _fleets.by_size = {}
+    fleet = fleets.get((num_buses, num_drivers))
+    if fleet is None:
+        if len(fleets) >= MAX_CACHED_FLEETS:
+            fleets.clear()
+        fleet = fleets[(num_buses, num_drivers)] = Fleet(num_buses, num_drivers)
+    return fleet.reset()
 
 # -----------------------------------------------------------
 # Линейный алгоритм
 # -----------------------------------------------------------
 
-def generate_day_schedule(day_idx, base_date, num_buses, num_drivers):
-    day_start = get_day_start(base_date, day_idx)
-    day_end   = get_day_end(base_date, day_idx)
-
-    buses = []
-    for b_id in range(1, num_buses+1):
-        b = Bus(b_id)
-        b.next_free_time = day_start
-        buses.append(b)
-
-    drivers = []
-    for d_id in range(1, num_drivers+1):
-        d_type = DRIVER_TYPE_A if (d_id % 2 == 0) else DRIVER_TYPE_B
-        drv = Driver(d_id, d_type)
-        drv.next_free_time = day_start
-        drv.last_break_time = day_start
-        drivers.append(drv)
-
-    schedule = []
-
-    while True:
-        bus_obj = min(buses, key=lambda x: x.next_free_time)
+def shuffle_drivers(drivers, rng=random):
+    # То же, что rng.shuffle (та же последовательность вызовов
+    # getrandbits, поэтому при одинаковом seed порядок совпадает),
+    # но без накладных расходов на _randbelow для каждого элемента
+    getrandbits = rng.getrandbits
+    for i in range(len(drivers) - 1, 0, -1):
+        n = i + 1
+        k = n.bit_length()
+        j = getrandbits(k)
+        while j >= n:
+            j = getrandbits(k)
+        drivers[i], drivers[j] = drivers[j], drivers[i]
+
+class DriverIndex:
+    # Водители, допущенные к работе в этот день (правило A/B проверяется
+    # один раз на день). Свободные к текущему моменту лежат в пуле free
+    # (позиции -- в pos, удаление за O(1)), занятые -- в куче busy по
+    # next_free_time. Момент release() не убывает (автобусы берутся из
+    # кучи по времени), поэтому из кучи в пул водители только переходят.
+    # Выработавшие лимит (с запасом на самый короткий рейс) выбрасываются.
+    # Записи в куче ленивые: устаревшие пропускаются при чтении.
+    def __init__(self, drivers, day_idx):
+        self.free = [drv for drv in drivers if drv.can_work_this_day(day_idx)]
+        self.pos = {drv.driver_id: i for i, drv in enumerate(self.free)}
+        self.busy = []
+
+    def release(self, current_time):
+        # Переносит в пул всех, кто освободился к current_time
+        busy = self.busy
+        while busy and busy[0][0] <= current_time:
+            free_time, d_id, drv = heapq.heappop(busy)
+            if free_time == drv.next_free_time and d_id not in self.pos:
+                self.pos[d_id] = len(self.free)
+                self.free.append(drv)
+
+    def candidates(self, rng=random):
+        # Пул в случайном порядке: частичная перетасовка Фишера-Йетса,
+        # так что случайный номер тянется только для проверенных водителей.
+        # Пул во время перебора не меняется (touch -- после него)
+        free, pos = self.free, self.pos
+        for i in range(len(free)):
+            j = rng.randrange(i, len(free))
+            free[i], free[j] = free[j], free[i]
+            pos[free[i].driver_id] = i
+            pos[free[j].driver_id] = j
+            yield free[i]
+
+    def touch(self, drv):
+        # Вызывать после каждого изменения drv.next_free_time (оно всегда
+        # позже текущего момента, так что водитель уходит из пула)
+        i = self.pos.pop(drv.driver_id, None)
+        if i is not None:
+            last = self.free.pop()
+            if last is not drv:
+                self.free[i] = last
+                self.pos[last.driver_id] = i
+        if drv.worked + ROUTE_MIN <= drv.limit_min:
+            heapq.heappush(self.busy, (drv.next_free_time, drv.driver_id, drv))
+
+def linear_day_rows(day_idx, num_buses, num_drivers, rng=random):
+    day_end = DAY_MINUTES
+    peak = peak_minutes(day_idx)
+
+    buses, drivers = day_fleet(num_buses, num_drivers)
+    # Очередь автобусов: (next_free_time, bus_id). При равном времени
+    # первым идёт автобус с меньшим id -- так же, как min() по списку.
+    bus_heap = [(0, b.bus_id) for b in buses]
+    index = DriverIndex(drivers, day_idx)
+    sampler = RouteSampler(rng, num_buses * max_attempts_per_bus(),
+                           count_type_b(num_drivers) * max_breaks_per_driver())
+
+    rows = []
+
+    while buses and bus_heap[0][0] < day_end:
+        bus_obj = buses[bus_heap[0][1] - 1]
         current_time = bus_obj.next_free_time
-        if current_time >= day_end:
-            break
 
-        dur = random_route_duration()
+        dur = sampler.route_minutes()
         chosen_driver = None
-        random.shuffle(drivers)
+        # Кандидаты -- только свободные к current_time (пул индекса), в
+        # случайном порядке; водители, ушедшие на отдых, уходят из пула
+        # после перебора
+        index.release(current_time)
+        rested = []
+        for drv in index.candidates(rng):
+            if not drv.can_take_route(current_time, dur):
+                continue
 
-        for drv in drivers:
-            if not drv.can_work_this_day(day_idx):
+            free_before = drv.next_free_time
+            ready = drv.rest_before(current_time, peak, sampler)
+            if ready < 0:
                 continue
+            if drv.next_free_time != free_before:
+                rested.append(drv)
+            # Сдвиг из-за отдыха остаётся и для следующих кандидатов
+            current_time = ready
             if not drv.can_take_route(current_time, dur):
                 continue
 
-            # A: обед
-            if drv.driver_type == DRIVER_TYPE_A:
-                if drv.worked >= timedelta(hours=4) and drv.worked < timedelta(hours=5):
-                    if is_peak_hour(current_time, day_idx):
-                        continue
-                    else:
-                        lunch_start = max(drv.next_free_time, current_time)
-                        lunch_end   = lunch_start + LUNCH_TIME_A
-                        if lunch_end > day_end:
-                            continue
-                        drv.worked += LUNCH_TIME_A
-                        drv.next_free_time = lunch_end
-                        if lunch_end > current_time:
-                            current_time = lunch_end
-
-                if not drv.can_take_route(current_time, dur):
-                    continue
-
-            # B: перерыв
-            if drv.driver_type == DRIVER_TYPE_B:
-                time_since_break = current_time - drv.last_break_time
-                if time_since_break >= BREAK_INTERVAL_B:
-                    if not drv.long_break_used:
-                        br_len = LONG_BREAK_B
-                        drv.long_break_used = True
-                    else:
-                        br_len = random.randint(*SHORT_BREAK_B_RANGE)
-                    br_td = timedelta(minutes=br_len)
-
-                    br_start = max(drv.next_free_time, current_time)
-                    br_end   = br_start + br_td
-                    if br_end > day_end:
-                        continue
-                    drv.worked += br_td
-                    drv.next_free_time = br_end
-                    drv.last_break_time = br_end
-                    if br_end > current_time:
-                        current_time = br_end
-
-                if not drv.can_take_route(current_time, dur):
-                    continue
-
             chosen_driver = drv
             break
+        for drv in rested:
+            index.touch(drv)
 
         if chosen_driver is None:
-            bus_obj.next_free_time += timedelta(minutes=10)
-            continue
+            bus_obj.next_free_time += BUS_RETRY_STEP
         else:
-            start_dt = current_time
-            end_dt   = current_time + dur
-            if end_dt > day_end:
+            end_time = current_time + dur
+            if end_time > day_end:
                 bus_obj.next_free_time = day_end
-                continue
+            else:
+                bus_obj.next_free_time = end_time + BUS_TURNAROUND
+                chosen_driver.worked += dur
+                chosen_driver.next_free_time = end_time
+                index.touch(chosen_driver)
 
-            bus_obj.next_free_time = end_dt + timedelta(minutes=15)
-            chosen_driver.worked += dur
-            chosen_driver.next_free_time = end_dt
-
-            schedule.append({
-                "DayIdx": day_idx,
-                "Date":   start_dt.strftime("%Y-%m-%d"),
-                "Start":  start_dt.strftime("%H:%M"),
-                "End":    end_dt.strftime("%H:%M"),
-                "Bus ID": bus_obj.bus_id,
-                "Driver ID": chosen_driver.driver_id,
-                "DriverType": chosen_driver.driver_type,
-                "Duration": int(dur.total_seconds()//60),
-                "IsPeak": is_peak_hour(start_dt, day_idx)
-            })
-
-    schedule.sort(key=lambda x: x["Start"])
-    return schedule
+                rows.append((day_idx, current_time, end_time, bus_obj.bus_id,
+                             chosen_driver.driver_id, chosen_driver.driver_type,
+                             peak[current_time]))
+
+        heapq.heapreplace(bus_heap, (bus_obj.next_free_time, bus_obj.bus_id))
+
+    sort_day_rows(rows)
+    return rows
+
+def generate_day_schedule(day_idx, base_date, num_buses, num_drivers, rng=random):
+    rows = linear_day_rows(day_idx, num_buses, num_drivers, rng)
+    return rows_to_records(rows, base_date)
 
-def generate_linear_schedule_week(base_date_str, num_buses, num_drivers):
+def generate_linear_schedule_week(base_date_str, num_buses, num_drivers,
+                                  days=WEEK_DAYS, workers=None, seed=None, rng=random):
     base_date = datetime.strptime(base_date_str, "%Y-%m-%d")
-    all_sched = []
-    for day_idx in range(WEEK_DAYS):
-        day_sched = generate_day_schedule(day_idx, base_date, num_buses, num_drivers)
-        all_sched.extend(day_sched)
-    all_sched.sort(key=lambda x: (x["DayIdx"], x["Date"], x["Start"]))
-    return all_sched
+    all_rows = build_days_rows(linear_day_rows, num_buses, num_drivers,
+                               days, workers, seed, rng)
+    return rows_to_records(all_rows, base_date)
 
 # -----------------------------------------------------------
 # Генетический алгоритм (упрощённо, но с учетом тех же правил)
 # -----------------------------------------------------------
 
-class GaDriver:
-    def __init__(self, driver_id):
-        self.driver_id = driver_id
-        self.driver_type = DRIVER_TYPE_A if (driver_id % 2 == 0) else DRIVER_TYPE_B
-        self.max_hours = WORK_HOURS_A if self.driver_type==DRIVER_TYPE_A else WORK_HOURS_B
-        self.worked = timedelta(0)
-        self.next_free_time = None
-        self.last_break_time = None
-        self.long_break_used = False
-
-    def can_work_this_day(self, day_idx):
-        if self.driver_type == DRIVER_TYPE_A:
-            return True
-        return (day_idx % 3) == (self.driver_id % 3)
+def valid_day_rows(day_idx, num_buses, num_drivers, rng=random):
+    day_end = DAY_MINUTES
+    peak = peak_minutes(day_idx)
 
-    def can_take_route(self, start_dt, dur):
-        if self.next_free_time and start_dt < self.next_free_time:
-            return False
-        if self.worked + dur > timedelta(hours=self.max_hours):
-            return False
-        return True
+    buses, drivers = day_fleet(num_buses, num_drivers)
 
-def generate_valid_day(day_idx: int, base_date: datetime, num_buses, num_drivers):
-    day_start = get_day_start(base_date, day_idx)
-    day_end   = get_day_end(base_date, day_idx)
-
-    buses = []
-    for b_id in range(1, num_buses+1):
-        b = Bus(b_id)
-        b.next_free_time = day_start
-        buses.append(b)
-
-    drivers = []
-    for d_id in range(1, num_drivers+1):
-        gd = GaDriver(d_id)
-        gd.next_free_time = day_start
-        gd.last_break_time = day_start
-        drivers.append(gd)
-
-    schedule = []
+    rows = []
     # повышаем число маршрутов, чтобы не было слишком мало
-    n_routes = random.randint(20, 40)
+    n_routes = rng.randint(*VALID_DAY_ROUTES)
+    sampler = RouteSampler(rng, n_routes,
+                           count_type_b(num_drivers) * max_breaks_per_driver())
 
     for _ in range(n_routes):
-        bus_obj = random.choice(buses)
-        start_min = int((bus_obj.next_free_time - day_start).total_seconds()//60)
-        if start_min < 0:
-            start_min = 0
-        total_min = int((day_end - day_start).total_seconds()//60)
-        if start_min >= total_min:
+        bus_obj = rng.choice(buses)
+        start_min = bus_obj.next_free_time
+        if start_min >= day_end:
             continue
-        route_start_min = random.randint(start_min, total_min)
-        start_dt = day_start + timedelta(minutes=route_start_min)
-        dur = random_route_duration()
-        end_dt = start_dt + dur
-        if end_dt > day_end:
+        start_time = rng.randint(start_min, day_end)
+        dur = sampler.route_minutes()
+        end_time = start_time + dur
+        if end_time > day_end:
             continue
 
-        random.shuffle(drivers)
+        shuffle_drivers(drivers, rng)
         chosen = None
         for drv in drivers:
             if not drv.can_work_this_day(day_idx):
                 continue
-            if not drv.can_take_route(start_dt, dur):
+            if not drv.can_take_route(start_time, dur):
+                continue
+
+            free_before = drv.next_free_time
+            ready = drv.rest_before(start_time, peak, sampler)
+            if ready < 0:
                 continue
+            if drv.next_free_time != free_before:
+                start_time = ready
+                end_time = start_time + dur
+                if end_time > day_end:
+                    continue
 
-            # A: обед
-            if drv.driver_type == DRIVER_TYPE_A:
-                if drv.worked >= timedelta(hours=4) and drv.worked < timedelta(hours=5):
-                    if is_peak_hour(start_dt, day_idx):
-                        continue
-                    lunch_start = max(drv.next_free_time, start_dt)
-                    lunch_end   = lunch_start + LUNCH_TIME_A
-                    if lunch_end > day_end:
-                        continue
-                    drv.worked += LUNCH_TIME_A
-                    drv.next_free_time = lunch_end
-                    if lunch_end > start_dt:
-                        start_dt = lunch_end
-                    end_dt = start_dt + dur
-                    if end_dt>day_end:
-                        continue
-
-            # B: перерывы
-            if drv.driver_type == DRIVER_TYPE_B:
-                time_since_break = start_dt - drv.last_break_time
-                if time_since_break >= BREAK_INTERVAL_B:
-                    if not drv.long_break_used:
-                        br_len = LONG_BREAK_B
-                        drv.long_break_used = True
-                    else:
-                        br_len = random.randint(*SHORT_BREAK_B_RANGE)
-                    br_td = timedelta(minutes=br_len)
-                    br_start = max(drv.next_free_time, start_dt)
-                    br_end   = br_start + br_td
-                    if br_end>day_end:
-                        continue
-                    drv.worked += br_td
-                    drv.next_free_time = br_end
-                    drv.last_break_time = br_end
-                    if br_end>start_dt:
-                        start_dt = br_end
-                    end_dt = start_dt + dur
-                    if end_dt>day_end:
-                        continue
-
-            if not drv.can_take_route(start_dt, dur):
+            if not drv.can_take_route(start_time, dur):
                 continue
 
             chosen = drv
@@ -336,102 +498,1639 @@ def generate_valid_day(day_idx: int, base_date: datetime, num_buses, num_drivers
             continue
 
         chosen.worked += dur
-        chosen.next_free_time = end_dt
-        bus_obj.next_free_time = end_dt + timedelta(minutes=15)
+        chosen.next_free_time = end_time
+        bus_obj.next_free_time = end_time + BUS_TURNAROUND
 
-        schedule.append({
-            "DayIdx": day_idx,
-            "Date":   start_dt.strftime("%Y-%m-%d"),
-            "Start":  start_dt.strftime("%H:%M"),
-            "End":    end_dt.strftime("%H:%M"),
-            "Bus ID": bus_obj.bus_id,
-            "Driver ID": chosen.driver_id,
-            "DriverType": chosen.driver_type,
-            "Duration": int(dur.total_seconds()//60),
-            "IsPeak": is_peak_hour(start_dt, day_idx)
-        })
+        rows.append((day_idx, start_time, end_time, bus_obj.bus_id,
+                     chosen.driver_id, chosen.driver_type, peak[start_time]))
 
-    schedule.sort(key=lambda x: x["Start"])
-    return schedule
+    sort_day_rows(rows)
+    return rows
+
+def generate_valid_day(day_idx: int, base_date: datetime, num_buses, num_drivers,
+                       rng=random):
+    rows = valid_day_rows(day_idx, num_buses, num_drivers, rng)
+    return rows_to_records(rows, base_date)
+
+def generate_valid_week(base_date_str, num_buses, num_drivers,
+                        days=WEEK_DAYS, workers=None, seed=None, rng=random):
+    return valid_week_schedule(base_date_str, num_buses, num_drivers,
+                               days, workers, seed, rng).to_records()
+
+def valid_week_schedule(base_date_str, num_buses, num_drivers,
+                        days=WEEK_DAYS, workers=None, seed=None, rng=random):
+    base_date = datetime.strptime(base_date_str, "%Y-%m-%d")
+    full_rows = build_days_rows(valid_day_rows, num_buses, num_drivers,
+                                days, workers, seed, rng)
+    return Schedule.from_rows(full_rows, base_date, days)
+
+# -----------------------------------------------------------
+# Потоки случайных чисел
+# -----------------------------------------------------------
+
+# Все генераторы и операторы ГА берут случайность из явного rng
+# (random.Random; по умолчанию -- модуль random, т.е. общий поток).
+# Для дней, особей, островов и т.п. из одного seed порождаются
+# независимые потоки по "пути" (вид потока, номера...): результат
+# не зависит от того, в каком процессе и в каком порядке они считаются.
+STREAM_DAY = 0
+STREAM_INDIVIDUAL = 1
+STREAM_BREED = 2
+STREAM_ISLAND_INIT = 3
+STREAM_ISLAND_GEN = 4
+STREAM_SWEEP = 5
+STREAM_WARM_START = 6
+
+def spawn_seed(seed, *path):
+    state = np.random.SeedSequence(seed, spawn_key=path).generate_state(2, np.uint64)
+    return (int(state[0]) << 64) | int(state[1])
+
+def spawn_rng(seed, *path):
+    return random.Random(spawn_seed(seed, *path))
+
+# -----------------------------------------------------------
+# Построение по дням (последовательно или в пуле процессов)
+# -----------------------------------------------------------
 
-def generate_valid_week(base_date_str, num_buses, num_drivers):
+def _day_rows_task(day_fn, day_idx, seed, num_buses, num_drivers):
+    day_rows = day_fn(day_idx, num_buses, num_drivers, spawn_rng(seed, STREAM_DAY, day_idx))
+    sort_week_rows(day_rows)
+    return day_rows
+
+def iter_days_rows(day_fn, num_buses, num_drivers, days=WEEK_DAYS,
+                   workers=None, seed=None, rng=random):
+    # Отдаёт строки по дням, по порядку, каждый день -- в порядке
+    # (day, start). Дни не зависят друг от друга (автобусы и водители
+    # создаются заново каждый день), поэтому их можно строить параллельно.
+    #   seed is None и без пула -- как раньше, один поток rng на все дни;
+    #   иначе у каждого дня свой поток spawn_rng(seed, STREAM_DAY, day),
+    #   и результат не зависит от числа процессов.
+    # В пуле одновременно считается не больше 2*workers дней, так что
+    # память не растёт с длиной горизонта.
+    parallel = workers is not None and workers > 1
+    if seed is None and not parallel:
+        for day_idx in range(days):
+            day_rows = day_fn(day_idx, num_buses, num_drivers, rng)
+            sort_week_rows(day_rows)
+            yield day_rows
+        return
+
+    if seed is None:
+        seed = rng.getrandbits(64)
+
+    if not parallel:
+        for day_idx in range(days):
+            yield _day_rows_task(day_fn, day_idx, seed, num_buses, num_drivers)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for day_idx in range(days):
+            pending.append(pool.submit(_day_rows_task, day_fn, day_idx, seed,
+                                       num_buses, num_drivers))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def build_days_rows(day_fn, num_buses, num_drivers, days=WEEK_DAYS,
+                    workers=None, seed=None, rng=random):
+    rows = []
+    for day_rows in iter_days_rows(day_fn, num_buses, num_drivers, days,
+                                   workers, seed, rng):
+        rows.extend(day_rows)
+    return rows
+
+def iter_linear_days(base_date_str, num_buses, num_drivers, days=WEEK_DAYS,
+                     workers=None, seed=None, rng=random):
+    # Линейный алгоритм по дням: (base_date, итератор строк дня)
     base_date = datetime.strptime(base_date_str, "%Y-%m-%d")
-    full_sched = []
-    for day_idx in range(WEEK_DAYS):
-        day_sched = generate_valid_day(day_idx, base_date, num_buses, num_drivers)
-        full_sched.extend(day_sched)
-    full_sched.sort(key=lambda x: (x["DayIdx"], x["Date"], x["Start"]))
-    return full_sched
+    return base_date, iter_days_rows(linear_day_rows, num_buses, num_drivers,
+                                     days, workers, seed, rng)
+
+def iter_valid_days(base_date_str, num_buses, num_drivers, days=WEEK_DAYS,
+                    workers=None, seed=None, rng=random):
+    base_date = datetime.strptime(base_date_str, "%Y-%m-%d")
+    return base_date, iter_days_rows(valid_day_rows, num_buses, num_drivers,
+                                     days, workers, seed, rng)
+
+# -----------------------------------------------------------
+# Колоночное представление расписания (для ГА)
+# -----------------------------------------------------------
+
+class Schedule:
+    # Расписание как набор массивов NumPy одинаковой длины (по строке на
+    # рейс), отсортированных по (day, start). Кроссовер и мутация работают
+    # срезами и масками; записи для CSV строятся только в to_records().
+    COLUMNS = ("day", "start", "end", "bus", "driver", "dtype", "peak")
+    DTYPES = {
+        "day":    np.int16,
+        "start":  np.int16,   # минуты от начала смены
+        "end":    np.int16,
+        "bus":    np.int32,
+        "driver": np.int32,
+        "dtype":  np.int8,    # 0 -- DRIVER_TYPE_A, 1 -- DRIVER_TYPE_B
+        "peak":   np.bool_,
+    }
+
+    def __init__(self, base_date, days=WEEK_DAYS, **columns):
+        self.base_date = base_date
+        # Горизонт в днях (0..days-1): пустые дни в нём тоже учитываются
+        # (см. headway_penalty)
+        self.days = days
+        for name in self.COLUMNS:
+            setattr(self, name, columns[name])
+        # Кэш фитнеса; сбрасывается методами, меняющими строки
+        self.fitness = None
+        # Индексы ограничений по дням (DayConstraints), строятся лениво.
+        # Объекты могут быть общими с родителями, поэтому перед изменением
+        # день копируется (own_days -- уже скопированные)
+        self.constraints = {}
+        self.own_days = set()
+        # Покрытие по дням (DayCoverage) -- так же: лениво и с копированием
+        self.coverage = {}
+        self.own_coverage = set()
+
+    @classmethod
+    def empty(cls, base_date, days=WEEK_DAYS):
+        return cls(base_date, days, **{name: np.empty(0, dtype=dt)
+                                 for name, dt in cls.DTYPES.items()})
+
+    @classmethod
+    def from_rows(cls, rows, base_date, days=WEEK_DAYS):
+        if not rows:
+            return cls.empty(base_date, days)
+        day, start, end, bus, driver, d_type, peak = zip(*rows)
+        d_type = [t == DRIVER_TYPE_B for t in d_type]
+        values = (day, start, end, bus, driver, d_type, peak)
+        return cls(base_date, days, **{name: np.array(col, dtype=cls.DTYPES[name])
+                                 for name, col in zip(cls.COLUMNS, values)})
+
+    def __len__(self):
+        return len(self.day)
+
+    def __getstate__(self):
+        # Индексы дней (constraints, coverage) -- производные от строк и
+        # строятся лениво; между процессами их не передаём
+        state = dict(self.__dict__)
+        state["constraints"] = {}
+        state["own_days"] = set()
+        state["coverage"] = {}
+        state["own_coverage"] = set()
+        return state
+
+    def columns(self):
+        return {name: getattr(self, name) for name in self.COLUMNS}
+
+    def take(self, index):
+        # index -- булева маска или массив номеров строк
+        return Schedule(self.base_date, self.days,
+                        **{name: col[index] for name, col in self.columns().items()})
+
+    def day_slice(self, day_idx):
+        lo = int(np.searchsorted(self.day, day_idx, side="left"))
+        hi = int(np.searchsorted(self.day, day_idx, side="right"))
+        return slice(lo, hi)
+
+    def day_constraints(self, day_idx):
+        dc = self.constraints.get(day_idx)
+        if dc is None:
+            sl = self.day_slice(day_idx)
+            dc = DayConstraints.from_arrays(self.start[sl], self.end[sl],
+                                            self.bus[sl], self.driver[sl])
+            self.constraints[day_idx] = dc
+            self.own_days.add(day_idx)
+        return dc
+
+    def _writable_constraints(self, day_idx):
+        # None -- индекса для дня ещё нет, поддерживать нечего
+        dc = self.constraints.get(day_idx)
+        if dc is not None and day_idx not in self.own_days:
+            dc = dc.copy()
+            self.constraints[day_idx] = dc
+            self.own_days.add(day_idx)
+        return dc
+
+    def day_coverage(self, day_idx):
+        cov = self.coverage.get(day_idx)
+        if cov is None:
+            sl = self.day_slice(day_idx)
+            cov = DayCoverage.from_arrays(self.start[sl], self.end[sl])
+            self.coverage[day_idx] = cov
+            self.own_coverage.add(day_idx)
+        return cov
+
+    def _writable_coverage(self, day_idx):
+        cov = self.coverage.get(day_idx)
+        if cov is not None and day_idx not in self.own_coverage:
+            cov = cov.copy()
+            self.coverage[day_idx] = cov
+            self.own_coverage.add(day_idx)
+        return cov
+
+    def delete(self, idx):
+        day_idx = int(self.day[idx])
+        start, end = int(self.start[idx]), int(self.end[idx])
+        dc = self._writable_constraints(day_idx)
+        if dc is not None:
+            dc.remove(int(self.driver[idx]), int(self.bus[idx]), start, end)
+        cov = self._writable_coverage(day_idx)
+        if cov is not None:
+            cov.remove(start, end)
+        for name in self.COLUMNS:
+            setattr(self, name, np.delete(getattr(self, name), idx))
+        self.fitness = None
+
+    def reassign(self, idx, driver_id, bus_id):
+        dc = self._writable_constraints(int(self.day[idx]))
+        if dc is not None:
+            start, end = int(self.start[idx]), int(self.end[idx])
+            dc.remove(int(self.driver[idx]), int(self.bus[idx]), start, end)
+            dc.add(driver_id, bus_id, start, end)
+        self.driver[idx] = driver_id
+        self.dtype[idx] = driver_id % 2   # нечётный id -- тип B
+        self.bus[idx] = bus_id
+        self.fitness = None
+
+    @classmethod
+    def concat(cls, parts):
+        return cls(parts[0].base_date, max(p.days for p in parts),
+                   **{name: np.concatenate([getattr(p, name) for p in parts])
+                      for name in cls.COLUMNS})
+
+    def rows(self):
+        types = (DRIVER_TYPE_A, DRIVER_TYPE_B)
+        return [(day, start, end, bus, driver, types[t], peak)
+                for (day, start, end, bus, driver, t, peak)
+                in zip(*(getattr(self, name).tolist() for name in self.COLUMNS))]
+
+    def iter_days(self):
+        # Строки по дням, как у iter_days_rows
+        if not len(self):
+            return
+        cuts = np.flatnonzero(np.diff(self.day)) + 1
+        for sl_start, sl_end in zip(np.r_[0, cuts], np.r_[cuts, len(self)]):
+            yield self.take(slice(int(sl_start), int(sl_end))).rows()
+
+    def to_records(self):
+        return rows_to_records(self.rows(), self.base_date)
+
+# -----------------------------------------------------------
+# Индекс ограничений по дню (для проверки и ремонта мутаций)
+# -----------------------------------------------------------
+
+def driver_type_of(driver_id):
+    return DRIVER_TYPE_A if (driver_id % 2 == 0) else DRIVER_TYPE_B
+
+def driver_can_work(driver_id, day_idx):
+    # B: 1 день работы / 2 выходных
+    return driver_id % 2 == 0 or (day_idx % 3) == (driver_id % 3)
+
+def driver_rest_ok(intervals, d_type):
+    # Обед/перерывы по отсортированным рейсам водителя за день:
+    #   A -- первый рейс, перед которым отработано от 4 до 5 часов,
+    #        начинается не раньше чем через LUNCH_TIME_A после предыдущего;
+    #   B -- рейс, начатый через BREAK_INTERVAL_B и более после последнего
+    #        отдыха, сам идёт после отдыха (паузы >= SHORT_BREAK_B_RANGE[0]).
+    prev_end = 0
+    if d_type == DRIVER_TYPE_A:
+        worked = 0
+        for (start, end) in intervals:
+            if 240 <= worked < 300:
+                return start - prev_end >= LUNCH_MINUTES_A
+            worked += end - start
+            prev_end = end
+        return True
+
+    last_rest = 0
+    for (start, end) in intervals:
+        if start - prev_end >= SHORT_BREAK_B_RANGE[0]:
+            last_rest = start
+        elif start - last_rest >= BREAK_MINUTES_B:
+            return False
+        prev_end = end
+    return True
+
+class DayConstraints:
+    # Таймлайны одного дня: для каждого водителя и автобуса -- отсортированный
+    # список интервалов (start, end), плюс минуты в рейсах у водителей.
+    # Проверка одного рейса -- бинарный поиск по таймлайну (водитель за
+    # день делает порядка десятка рейсов, так что и проверка отдыха дешёвая).
+    __slots__ = ("drivers", "buses", "hours")
+
+    def __init__(self):
+        self.drivers = {}
+        self.buses = {}
+        self.hours = {}
+
+    @classmethod
+    def from_arrays(cls, start, end, bus, driver):
+        dc = cls()
+        for s, e, b, d in zip(start.tolist(), end.tolist(), bus.tolist(), driver.tolist()):
+            dc.add(d, b, s, e)
+        return dc
+
+    def copy(self):
+        dc = DayConstraints()
+        dc.drivers = {k: list(v) for k, v in self.drivers.items()}
+        dc.buses = {k: list(v) for k, v in self.buses.items()}
+        dc.hours = dict(self.hours)
+        return dc
+
+    def add(self, driver_id, bus_id, start, end):
+        bisect.insort(self.drivers.setdefault(driver_id, []), (start, end))
+        bisect.insort(self.buses.setdefault(bus_id, []), (start, end))
+        self.hours[driver_id] = self.hours.get(driver_id, 0) + end - start
+
+    def remove(self, driver_id, bus_id, start, end):
+        for timeline in (self.drivers[driver_id], self.buses[bus_id]):
+            del timeline[bisect.bisect_left(timeline, (start, end))]
+        self.hours[driver_id] -= end - start
+
+    def driver_fits(self, day_idx, driver_id, start, end):
+        if not driver_can_work(driver_id, day_idx):
+            return False
+        d_type = driver_type_of(driver_id)
+        limit = (WORK_HOURS_A if d_type == DRIVER_TYPE_A else WORK_HOURS_B) * 60
+        if self.hours.get(driver_id, 0) + end - start > limit:
+            return False
+        timeline = self.drivers.get(driver_id, [])
+        i = bisect.bisect_left(timeline, (start, end))
+        if i > 0 and timeline[i-1][1] > start:
+            return False
+        if i < len(timeline) and timeline[i][0] < end:
+            return False
+        return driver_rest_ok(timeline[:i] + [(start, end)] + timeline[i:], d_type)
+
+    def driver_release_ok(self, driver_id, start, end):
+        # Можно ли снять рейс с водителя: часов и пересечений от этого не
+        # прибавится, но у A может сдвинуться окно обеда на рейс без паузы
+        timeline = self.drivers.get(driver_id, [])
+        i = bisect.bisect_left(timeline, (start, end))
+        return driver_rest_ok(timeline[:i] + timeline[i+1:], driver_type_of(driver_id))
+
+    def bus_fits(self, bus_id, start, end):
+        timeline = self.buses.get(bus_id, [])
+        i = bisect.bisect_left(timeline, (start, end))
+        if i > 0 and timeline[i-1][1] + BUS_TURNAROUND > start:
+            return False
+        if i < len(timeline) and end + BUS_TURNAROUND > timeline[i][0]:
+            return False
+        return True
+
+# Листья дерева покрытия -- минуты 0..DAY_MINUTES, дополненные до степени двойки
+_COVERAGE_SIZE = 1 << DAY_MINUTES.bit_length()
+_NO_DEPARTURE = np.iinfo(np.int16).max
+
+class DayCoverage:
+    # Покрытие одного дня по минутам:
+    #   active     -- сколько рейсов (автобусов) в пути в минуту t, O(1);
+    #   departures -- сколько рейсов отправляется в минуту t;
+    #   first/last/gap -- дерево отрезков по минутам: первое и последнее
+    #     отправление в узле и наибольший интервал между соседними
+    #     отправлениями внутри него. Максимальный интервал в окне -- O(log n),
+    #     за весь день -- из корня, O(1).
+    # Строится один раз по рейсам дня, дальше add/remove обновляют его
+    # за O(длина рейса + log n).
+    __slots__ = ("active", "departures", "first", "last", "gap")
+
+    @classmethod
+    def from_arrays(cls, start, end):
+        cov = cls()
+        start = start.astype(np.intp)
+        end = end.astype(np.intp)
+        delta = np.zeros(DAY_MINUTES + 2, dtype=np.int32)
+        np.add.at(delta, start, 1)
+        np.add.at(delta, np.minimum(end, DAY_MINUTES + 1), -1)
+        cov.active = np.cumsum(delta)[:DAY_MINUTES + 1].astype(np.int16)
+        cov.departures = np.bincount(start, minlength=DAY_MINUTES + 1).astype(np.int16)
+
+        size = _COVERAGE_SIZE
+        minutes = np.arange(size, dtype=np.int16)
+        has = np.zeros(size, dtype=bool)
+        has[:DAY_MINUTES + 1] = cov.departures > 0
+        cov.first = np.full(2 * size, _NO_DEPARTURE, dtype=np.int16)
+        cov.last = np.full(2 * size, -1, dtype=np.int16)
+        cov.gap = np.zeros(2 * size, dtype=np.int16)
+        cov.first[size:][has] = minutes[has]
+        cov.last[size:][has] = minutes[has]
+        lo = size // 2
+        while lo:
+            left, right = slice(2 * lo, 4 * lo, 2), slice(2 * lo + 1, 4 * lo, 2)
+            cov.first[lo:2 * lo] = np.minimum(cov.first[left], cov.first[right])
+            cov.last[lo:2 * lo] = np.maximum(cov.last[left], cov.last[right])
+            between = np.where((cov.last[left] >= 0) & (cov.first[right] != _NO_DEPARTURE),
+                               cov.first[right] - cov.last[left], 0)
+            cov.gap[lo:2 * lo] = np.maximum(np.maximum(cov.gap[left], cov.gap[right]),
+                                            between)
+            lo //= 2
+        return cov
+
+    def copy(self):
+        cov = DayCoverage()
+        for name in self.__slots__:
+            setattr(cov, name, getattr(self, name).copy())
+        return cov
+
+    def add(self, start, end):
+        self.active[start:end] += 1
+        self.departures[start] += 1
+        if self.departures[start] == 1:
+            self._update_leaf(start)
+
+    def remove(self, start, end):
+        self.active[start:end] -= 1
+        self.departures[start] -= 1
+        if self.departures[start] == 0:
+            self._update_leaf(start)
+
+    def _update_leaf(self, minute):
+        first, last, gap = self.first, self.last, self.gap
+        i = _COVERAGE_SIZE + minute
+        if self.departures[minute]:
+            first[i] = last[i] = minute
+        else:
+            first[i], last[i] = _NO_DEPARTURE, -1
+        i //= 2
+        while i:
+            node = self._combine(self._node(2 * i), self._node(2 * i + 1))
+            first[i], last[i], gap[i] = node
+            i //= 2
+
+    def _node(self, i):
+        return int(self.first[i]), int(self.last[i]), int(self.gap[i])
+
+    @staticmethod
+    def _combine(left, right):
+        between = 0
+        if left[1] >= 0 and right[0] != _NO_DEPARTURE:
+            between = right[0] - left[1]
+        return (min(left[0], right[0]), max(left[1], right[1]),
+                max(left[2], right[2], between))
+
+    def in_service(self, minute):
+        return int(self.active[minute])
+
+    def max_headway(self, lo=0, hi=DAY_MINUTES):
+        # Наибольшее время в окне [lo, hi] без отправлений: интервалы между
+        # соседними отправлениями, а также от lo до первого и от последнего до hi
+        if lo <= 0 and hi >= DAY_MINUTES:
+            node = self._node(1)
+        else:
+            node = (_NO_DEPARTURE, -1, 0)
+            right_nodes = []
+            i, j = _COVERAGE_SIZE + lo, _COVERAGE_SIZE + hi + 1
+            while i < j:
+                if i & 1:
+                    node = self._combine(node, self._node(i))
+                    i += 1
+                if j & 1:
+                    j -= 1
+                    right_nodes.append(j)
+                i //= 2
+                j //= 2
+            for k in reversed(right_nodes):
+                node = self._combine(node, self._node(k))
+        first, last, gap = node
+        if last < 0:
+            return hi - lo
+        return max(gap, first - lo, hi - last)
+
+def repair_assignment(schedule, idx, new_drv, new_bus, num_buses, num_drivers,
+                      rng=random):
+    # Проверяет новое назначение рейса idx по индексу его дня. Если водитель
+    # или автобус не подходит, пробует других случайных (REPAIR_ATTEMPTS раз),
+    # а если не нашлось -- оставляет прежнего. Прежний водитель остаётся и
+    # тогда, когда без этого рейса у него нарушится отдых.
+    day_idx = int(schedule.day[idx])
+    start, end = int(schedule.start[idx]), int(schedule.end[idx])
+    cur_drv, cur_bus = int(schedule.driver[idx]), int(schedule.bus[idx])
+    dc = schedule.day_constraints(day_idx)
+
+    if new_drv != cur_drv and not dc.driver_release_ok(cur_drv, start, end):
+        new_drv = cur_drv
+    for _ in range(REPAIR_ATTEMPTS):
+        if new_drv == cur_drv or dc.driver_fits(day_idx, new_drv, start, end):
+            break
+        new_drv = rng.randint(1, num_drivers)
+    else:
+        new_drv = cur_drv
+
+    for _ in range(REPAIR_ATTEMPTS):
+        if new_bus == cur_bus or dc.bus_fits(new_bus, start, end):
+            break
+        new_bus = rng.randint(1, num_buses)
+    else:
+        new_bus = cur_bus
+
+    return new_drv, new_bus
+
+def repair_deletion(schedule, idx, rng=random):
+    # Рейс для удаления: idx или другой случайный (REPAIR_ATTEMPTS попыток),
+    # без которого у водителя не нарушится отдых; None -- не удалять
+    for _ in range(REPAIR_ATTEMPTS):
+        dc = schedule.day_constraints(int(schedule.day[idx]))
+        if dc.driver_release_ok(int(schedule.driver[idx]),
+                                int(schedule.start[idx]), int(schedule.end[idx])):
+            return idx
+        idx = rng.randint(0, len(schedule)-1)
+    return None
+
+# -----------------------------------------------------------
+# Проверка готового расписания целиком
+# -----------------------------------------------------------
+
+# Правила; считаются рейсы, которые их нарушают
+#   driver_overlap -- рейс водителя начинается до конца его предыдущего;
+#   bus_overlap    -- то же для автобуса;
+#   bus_turnaround -- у автобуса меньше BUS_TURNAROUND минут между рейсами;
+#   driver_hours   -- рейс, на котором водитель превысил лимит часов за день;
+#   day_off        -- водитель B работает в свой выходной (см. driver_can_work);
+#   driver_rest    -- нет обеда A или перерыва B (см. driver_rest_ok).
+VIOLATION_RULES = ("driver_overlap", "bus_overlap", "bus_turnaround",
+                   "driver_hours", "day_off", "driver_rest")
+
+# Штраф фитнеса за каждый рейс-нарушение (0 -- проверка не запускается)
+VIOLATION_PENALTY = 0.0
+
+_GROUP_SPAN = 1 << 32   # больше любого значения минут внутри группы
+
+def _group_starts(*keys):
+    # Начало группы (одинаковые ключи подряд) для отсортированных строк
+    first = np.zeros(len(keys[0]), dtype=bool)
+    first[0] = True
+    for key in keys:
+        first[1:] |= key[1:] != key[:-1]
+    return first
+
+def _prev_running_max(values, first):
+    # Максимум values по предыдущим строкам своей группы (-_GROUP_SPAN у
+    # первой строки группы). Группы идут подряд; сдвиг на номер группы не
+    # даёт максимуму "перетечь" из предыдущей.
+    shift = (np.cumsum(first) - 1) * _GROUP_SPAN
+    running = np.maximum.accumulate(values + shift) - shift
+    prev = np.empty_like(running)
+    prev[1:] = running[:-1]
+    prev[first] = -_GROUP_SPAN
+    return prev
+
+def validate_schedule(schedule, with_rows=False):
+    # Все правила по Schedule сразу: сортировки по (day, driver, start) и
+    # (day, bus, start) и разности соседних строк, без циклов по рейсам.
+    # Возвращает {правило: число рейсов}, с with_rows -- ещё и
+    # {правило: номера строк schedule}.
+    rows = {rule: np.empty(0, dtype=np.intp) for rule in VIOLATION_RULES}
+    if len(schedule):
+        day = schedule.day.astype(np.int64)
+        start = schedule.start.astype(np.int64)
+        end = schedule.end.astype(np.int64)
+        driver = schedule.driver.astype(np.int64)
+        bus = schedule.bus.astype(np.int64)
+
+        # Водители
+        order = np.lexsort((end, start, driver, day))
+        d_day, d_drv = day[order], driver[order]
+        s, e = start[order], end[order]
+        first = _group_starts(d_day, d_drv)
+        rows["driver_overlap"] = order[s < _prev_running_max(e, first)]
+
+        dur = e - s
+        worked = np.cumsum(dur)
+        worked -= (worked - dur)[first][np.cumsum(first) - 1]   # с начала дня, включая рейс
+        worked_before = worked - dur
+        is_b = d_drv % 2 == 1
+        limit = np.where(is_b, WORK_HOURS_B * 60, WORK_HOURS_A * 60)
+        rows["driver_hours"] = order[worked > limit]
+        rows["day_off"] = order[is_b & (d_day % 3 != d_drv % 3)]
+
+        prev_end = np.empty_like(e)
+        prev_end[0] = 0
+        prev_end[1:] = e[:-1]
+        prev_end[first] = 0
+        gap = s - prev_end
+        # A: обед перед первым рейсом, к которому отработано от 4 до 5 часов
+        lunch_due = ~is_b & (worked_before >= 240) & (worked_before < 300)
+        first_due = lunch_due.copy()
+        first_due[1:] &= ~(lunch_due[:-1] & ~first[1:])
+        a_bad = first_due & (gap < LUNCH_MINUTES_A)
+        # B: рейс без отдыха через BREAK_INTERVAL_B после последнего отдыха
+        rested = gap >= SHORT_BREAK_B_RANGE[0]
+        last_rest = np.maximum(_prev_running_max(np.where(rested, s, 0), first), 0)
+        b_bad = is_b & ~rested & (s - last_rest >= BREAK_MINUTES_B)
+        rows["driver_rest"] = order[a_bad | b_bad]
+
+        # Автобусы
+        order = np.lexsort((end, start, bus, day))
+        s = start[order]
+        prev_end = _prev_running_max(end[order], _group_starts(day[order], bus[order]))
+        overlap = s < prev_end
+        rows["bus_overlap"] = order[overlap]
+        rows["bus_turnaround"] = order[~overlap & (s < prev_end + BUS_TURNAROUND)]
+
+    counts = {rule: len(idx) for rule, idx in rows.items()}
+    if with_rows:
+        return counts, {rule: np.sort(idx) for rule, idx in rows.items()}
+    return counts
+
+def violation_count(schedule):
+    return sum(validate_schedule(schedule).values())
+
+# Режим фитнеса с учётом интервалов движения: за каждый день штраф
+# HEADWAY_WEIGHT за каждую минуту наибольшего интервала без отправлений
+# сверх HEADWAY_TARGET (0 -- режим выключен)
+HEADWAY_WEIGHT = 0.0
+HEADWAY_TARGET = 30
+
+def headway_penalty(schedule, days=None):
+    # По индексам покрытия дней: максимум за день берётся из корня дерева,
+    # так что повторная оценка не пересматривает рейсы. Считаются все дни
+    # горизонта days (по умолчанию schedule.days; и дальше, если в
+    # расписании есть более поздние дни): пустой день в конце штрафуется
+    # так же, как в середине.
+    horizon = schedule.days if days is None else days
+    if len(schedule):
+        horizon = max(horizon, int(schedule.day[-1]) + 1)
+    penalty = 0
+    for day_idx in range(horizon):
+        penalty += max(0, schedule.day_coverage(day_idx).max_headway() - HEADWAY_TARGET)
+    return penalty
+
+def schedule_fitness(total_routes, peak_routes, unique_drv):
+    return 2*peak_routes + total_routes - 1.5*unique_drv
 
 def evaluate_schedule(schedule):
-    df = pd.DataFrame(schedule)
-    total_routes = len(df)
-    peak_routes  = df["IsPeak"].sum() if not df.empty else 0
-    unique_drv   = df["Driver ID"].nunique() if not df.empty else 1
-    fit = 2*peak_routes + total_routes - 1.5*unique_drv
-    return fit
-
-def select_parent(population):
-    pair = random.sample(population, 2)
+    if not isinstance(schedule, Schedule):
+        # Список записей (линейный алгоритм)
+        total_routes = len(schedule)
+        peak_routes  = sum(1 for r in schedule if r["IsPeak"])
+        unique_drv   = len({r["Driver ID"] for r in schedule}) if schedule else 1
+        return schedule_fitness(total_routes, peak_routes, unique_drv)
+
+    if schedule.fitness is None:
+        total_routes = len(schedule)
+        if total_routes:
+            peak_routes = int(np.count_nonzero(schedule.peak))
+            unique_drv  = int(np.count_nonzero(np.bincount(schedule.driver)))
+        else:
+            peak_routes, unique_drv = 0, 1
+        fitness = schedule_fitness(total_routes, peak_routes, unique_drv)
+        if VIOLATION_PENALTY:
+            fitness -= VIOLATION_PENALTY * violation_count(schedule)
+        if HEADWAY_WEIGHT:
+            fitness -= HEADWAY_WEIGHT * headway_penalty(schedule, schedule.days)
+        schedule.fitness = fitness
+    return schedule.fitness
+
+def select_parent(population, rng=random):
+    pair = rng.sample(population, 2)
     best = max(pair, key=evaluate_schedule)
     return best
 
 def crossover(p1, p2):
-    df1 = pd.DataFrame(p1)
-    df2 = pd.DataFrame(p2)
-    c1 = df1[df1["DayIdx"] <= 2]
-    c2 = df2[df2["DayIdx"] >= 3]
-    child_df = pd.concat([c1, c2], ignore_index=True)
-    child_df.sort_values(by=["DayIdx","Date","Start"], inplace=True)
-    return child_df.to_dict("records")
-
-def mutate(schedule, num_buses, num_drivers, mutation_rate=0.2):
-    import random
-    if random.random() < mutation_rate and schedule:
-        r = random.random()
+    # Дни 0..2 от первого родителя, 3.. от второго. Оба родителя
+    # отсортированы по (day, start), поэтому потомок тоже. Дни берутся
+    # целиком, а ограничения действуют внутри дня, так что допустимые
+    # родители дают допустимого потомка; индексы дней переходят к нему.
+    c1 = p1.take(p1.day <= 2)
+    c2 = p2.take(p2.day >= 3)
+    child = Schedule.concat([c1, c2])
+    for parent, days in ((p1, lambda d: d <= 2), (p2, lambda d: d >= 3)):
+        for day_idx, dc in parent.constraints.items():
+            if days(day_idx):
+                child.constraints[day_idx] = dc
+        for day_idx, cov in parent.coverage.items():
+            if days(day_idx):
+                child.coverage[day_idx] = cov
+    return child
+
+def mutate(schedule, num_buses, num_drivers, mutation_rate=0.2, repair=True, rng=random):
+    # Время рейсов не меняется, поэтому порядок (day, start) сохраняется
+    # и пересортировка не нужна. repair -- проверять новое назначение и
+    # удаление по индексу ограничений дня (см. repair_assignment,
+    # repair_deletion)
+    if rng.random() < mutation_rate and len(schedule):
+        r = rng.random()
         if r < 0.3:
             # Удаляем один маршрут
-            idx = random.randint(0, len(schedule)-1)
-            schedule.pop(idx)
+            idx = rng.randint(0, len(schedule)-1)
+            if repair:
+                idx = repair_deletion(schedule, idx, rng)
+            if idx is not None:
+                schedule.delete(idx)
         else:
             # Изменяем одного маршрута
-            idx = random.randint(0, len(schedule)-1)
-            new_drv = random.randint(1, num_drivers)
-            schedule[idx]["Driver ID"] = new_drv
-            schedule[idx]["DriverType"] = "A" if (new_drv % 2 == 0) else "B"
-            schedule[idx]["Bus ID"] = random.randint(1, num_buses)
-
-    # Сортируем
-    schedule.sort(key=lambda x: (x["DayIdx"], x["Date"], x["Start"]))
+            idx = rng.randint(0, len(schedule)-1)
+            new_drv = rng.randint(1, num_drivers)
+            new_bus = rng.randint(1, num_buses)
+            if repair:
+                new_drv, new_bus = repair_assignment(schedule, idx, new_drv, new_bus,
+                                                     num_buses, num_drivers, rng)
+            schedule.reassign(idx, new_drv, new_bus)
     return schedule
 
+# -----------------------------------------------------------
+# Замеры ГА по фазам
+# -----------------------------------------------------------
 
+class GaStats:
+    # Время и число вызовов по фазам (init, select, crossover, mutate,
+    # evaluate; в параллельном режиме вместо select/crossover/mutate --
+    # breed, в островном -- evolve и migrate) и запись на каждое поколение.
+    # Передаётся в run_genetic(stats=...); без него замеров нет вовсе.
+    #   profile      -- дополнительно cProfile за весь прогон
+    #   trace_memory -- пиковая память через tracemalloc
+    def __init__(self, profile=False, trace_memory=False):
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.phase_time = {}
+        self.phase_calls = {}
+        self.generations = []
+        self.total_time = 0.0
+        self.peak_memory = None
+        self.profile_text = None
+        self._gen_phase_time = {}
+        self._profiler = None
+        self._started = None
+
+    def add(self, phase, seconds, calls=1):
+        self.phase_time[phase] = self.phase_time.get(phase, 0.0) + seconds
+        self.phase_calls[phase] = self.phase_calls.get(phase, 0) + calls
+        self._gen_phase_time[phase] = self._gen_phase_time.get(phase, 0.0) + seconds
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self):
+        if self._profiler is not None:
+            self._profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(25)
+            self.profile_text = out.getvalue()
+            self._profiler = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        self.total_time = time.perf_counter() - self._started
+
+    def end_generation(self, progress):
+        record = dict(progress._asdict())
+        record["phases"] = self._gen_phase_time
+        self.generations.append(record)
+        self._gen_phase_time = {}
+
+    def report(self):
+        lines = [f"Время ГА: {self.total_time:.3f} с"]
+        for phase, seconds in sorted(self.phase_time.items(), key=lambda kv: -kv[1]):
+            share = 100 * seconds / self.total_time if self.total_time else 0.0
+            lines.append(f"  {phase:10} {seconds:8.3f} с  {share:5.1f}%  "
+                         f"вызовов: {self.phase_calls[phase]}")
+        if self.peak_memory is not None:
+            lines.append(f"Пиковая память: {self.peak_memory / 2**20:.1f} МБ")
+        return "\n".join(lines) + "\n"
+
+def breed_child(population, num_buses, num_drivers, stats=None, rng=random):
+    if stats is None:
+        p1 = select_parent(population, rng)
+        p2 = select_parent(population, rng)
+        child = crossover(p1, p2)
+        return mutate(child, num_buses, num_drivers, rng=rng)
+
+    t0 = time.perf_counter()
+    p1 = select_parent(population, rng)
+    p2 = select_parent(population, rng)
+    t1 = time.perf_counter()
+    child = crossover(p1, p2)
+    t2 = time.perf_counter()
+    child = mutate(child, num_buses, num_drivers, rng=rng)
+    t3 = time.perf_counter()
+    stats.add("select", t1 - t0, 2)
+    stats.add("crossover", t2 - t1)
+    stats.add("mutate", t3 - t2)
+    return child
+
+def select_elites(population, elite):
+    # elite лучших особей (при равном фитнесе -- в порядке популяции)
+    if elite <= 0:
+        return []
+    return sorted(population, key=evaluate_schedule, reverse=True)[:elite]
+
+def next_generation(population, num_buses, num_drivers, elite=0, stats=None,
+                    rng=random):
+    new_pop = select_elites(population, elite)
+    for _ in range(len(population) - len(new_pop)):
+        new_pop.append(breed_child(population, num_buses, num_drivers, stats, rng))
+    return new_pop
+
+# Состояние прогона для progress-callback: generation -- сколько поколений
+# уже построено (0 -- начальная популяция), elapsed -- секунды с начала
+GaProgress = namedtuple("GaProgress",
+                        "generation generations best_fitness mean_fitness elapsed")
+
+class GaMonitor:
+    # Лучшая особь за весь прогон, отчёт о прогрессе и отмена.
+    #   progress -- callable(GaProgress) или None
+    #   cancel   -- объект с is_set() (например, threading.Event) или None
+    #   stats    -- GaStats или None
+    def __init__(self, generations, progress=None, cancel=None, stats=None):
+        self.generations = generations
+        self.progress = progress
+        self.cancel = cancel
+        self.stats = stats
+        self.started = time.monotonic()
+        self.best = None
+
+    def observe(self, generation, population):
+        t0 = time.perf_counter()
+        fits = [evaluate_schedule(ind) for ind in population]
+        best_i = max(range(len(fits)), key=fits.__getitem__)
+        if self.best is None or fits[best_i] > evaluate_schedule(self.best):
+            self.best = population[best_i]
+        if self.progress is None and self.stats is None:
+            return
+        report = GaProgress(generation, self.generations,
+                            evaluate_schedule(self.best),
+                            sum(fits) / len(fits),
+                            time.monotonic() - self.started)
+        if self.stats is not None:
+            self.stats.add("evaluate", time.perf_counter() - t0, len(population))
+            self.stats.end_generation(report)
+        if self.progress is not None:
+            self.progress(report)
+
+    def cancelled(self):
+        return self.cancel is not None and self.cancel.is_set()
+
+def run_genetic(base_date_str, num_buses, num_drivers, pop_size=15, generations=20,
+                workers=None, seed=None, elite=0, progress=None, cancel=None,
+                stats=None, initial=None, days=WEEK_DAYS):
+    # workers > 1 -- параллельный режим (см. run_genetic_parallel).
+    # days -- горизонт особей в днях.
+    # Возвращает лучшую особь за весь прогон; при отмене (cancel.is_set())
+    # -- лучшую из найденных к этому моменту. stats -- GaStats для замеров.
+    # initial -- готовые особи для начальной популяции (тёплый старт, см.
+    # warm_start_population); остальные строятся случайно, как обычно.
+    if workers is not None and workers > 1:
+        return run_genetic_parallel(base_date_str, num_buses, num_drivers,
+                                    pop_size, generations, workers, seed, elite,
+                                    progress, cancel, stats, initial, days)
+    # С seed особи и потомки получают те же потоки spawn_rng(seed, вид,
+    # [поколение,] номер), что и в параллельном режиме, так что результат
+    # от пула не зависит. Без seed -- общий модуль random, как раньше.
+    monitor = GaMonitor(generations, progress, cancel, stats)
+    if stats is not None:
+        stats.start()
+
+    try:
+        t0 = time.perf_counter()
+        population = list(initial or ())[:pop_size]
+        if seed is None:
+            for _ in range(pop_size - len(population)):
+                population.append(valid_week_schedule(base_date_str, num_buses,
+                                                      num_drivers, days))
+        else:
+            paths = [(STREAM_INDIVIDUAL, i) for i in range(pop_size - len(population))]
+            population += _init_individuals_task(seed, paths, base_date_str,
+                                                 num_buses, num_drivers, days)
+        if stats is not None:
+            stats.add("init", time.perf_counter() - t0, pop_size)
+        monitor.observe(0, population)
+
+        for gen in range(generations):
+            if monitor.cancelled():
+                break
+            if seed is None:
+                population = next_generation(population, num_buses, num_drivers,
+                                             elite, stats)
+            else:
+                elites = select_elites(population, elite)
+                population = elites + [
+                    breed_child(population, num_buses, num_drivers, stats,
+                                spawn_rng(seed, STREAM_BREED, gen, i))
+                    for i in range(pop_size - len(elites))]
+            monitor.observe(gen + 1, population)
+    finally:
+        if stats is not None:
+            stats.stop()
+
+    return monitor.best
 
-def run_genetic(base_date_str, num_buses, num_drivers, pop_size=15, generations=20):
+# -----------------------------------------------------------
+# Параллельный ГА (пул процессов)
+# -----------------------------------------------------------
+
+def split_chunks(items, n):
+    # n почти равных непрерывных кусков (без пустых)
+    n = max(1, min(n, len(items)))
+    size, extra = divmod(len(items), n)
+    chunks, pos = [], 0
+    for i in range(n):
+        end = pos + size + (1 if i < extra else 0)
+        chunks.append(items[pos:end])
+        pos = end
+    return chunks
+
+def _init_individuals_task(seed, paths, base_date_str, num_buses, num_drivers,
+                           days=WEEK_DAYS):
+    # paths -- пути потоков (см. spawn_rng), по одному на особь
+    population = []
+    for path in paths:
+        ind = valid_week_schedule(base_date_str, num_buses, num_drivers, days,
+                                  rng=spawn_rng(seed, *path))
+        evaluate_schedule(ind)
+        population.append(ind)
+    return population
+
+def pack_population(population):
+    # Популяция одним набором столбцов (+ границы особей и их фитнес):
+    # так её передача в процесс -- копирование нескольких массивов, а не
+    # pickle тысяч мелких
+    bounds = np.cumsum([0] + [len(ind) for ind in population])
+    merged = Schedule.concat(population)
+    return (population[0].base_date, merged.days, bounds,
+            [ind.fitness for ind in population], merged.columns())
+
+def unpack_population(packed):
+    base_date, days, bounds, fitness, columns = packed
     population = []
-    for _ in range(pop_size):
-        ind = generate_valid_week(base_date_str, num_buses, num_drivers)
+    for i, (lo, hi) in enumerate(zip(bounds.tolist(), bounds[1:].tolist())):
+        ind = Schedule(base_date, days, **{name: col[lo:hi].copy()
+                                           for name, col in columns.items()})
+        ind.fitness = fitness[i]
         population.append(ind)
+    return population
+
+def _breed_children_task(packed_population, seed, paths, num_buses, num_drivers):
+    # Популяция упакована один раз на поколение (pack_population)
+    population = unpack_population(packed_population)
+    children = []
+    for path in paths:
+        child = breed_child(population, num_buses, num_drivers, rng=spawn_rng(seed, *path))
+        # Фитнес считаем здесь же, в рабочем процессе: он вернётся в
+        # основной процесс вместе с особью (кэш Schedule.fitness)
+        evaluate_schedule(child)
+        children.append(child)
+    return children
+
+def run_genetic_parallel(base_date_str, num_buses, num_drivers, pop_size=15,
+                         generations=20, workers=None, seed=None, elite=0,
+                         progress=None, cancel=None, stats=None, initial=None,
+                         days=WEEK_DAYS):
+    # Каждая особь строится со своим потоком spawn_rng(seed, вид,
+    # [поколение,] номер), поэтому результат зависит только от seed и не
+    # зависит от числа процессов и порядка их завершения.
+    if seed is None:
+        seed = random.getrandbits(64)
+
+    monitor = GaMonitor(generations, progress, cancel, stats)
+    if stats is not None:
+        stats.start()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            n_chunks = workers or os.cpu_count() or 1
+            t0 = time.perf_counter()
+            population = list(initial or ())[:pop_size]
+            paths = [(STREAM_INDIVIDUAL, i) for i in range(pop_size - len(population))]
+            futures = [pool.submit(_init_individuals_task, seed, chunk, base_date_str,
+                                   num_buses, num_drivers, days)
+                       for chunk in split_chunks(paths, n_chunks) if chunk]
+            population += [ind for f in futures for ind in f.result()]
+            if stats is not None:
+                stats.add("init", time.perf_counter() - t0, pop_size)
+            monitor.observe(0, population)
+
+            for gen in range(generations):
+                if monitor.cancelled():
+                    break
+                t0 = time.perf_counter()
+                elites = select_elites(population, elite)
+                paths = [(STREAM_BREED, gen, i) for i in range(pop_size - len(elites))]
+                packed = pack_population(population)
+                futures = [pool.submit(_breed_children_task, packed, seed, chunk,
+                                       num_buses, num_drivers)
+                           for chunk in split_chunks(paths, n_chunks)]
+                population = elites + [child for f in futures for child in f.result()]
+                if stats is not None:
+                    stats.add("breed", time.perf_counter() - t0, pop_size - len(elites))
+                monitor.observe(gen + 1, population)
+    finally:
+        if stats is not None:
+            stats.stop()
+
+    return monitor.best
+
+# -----------------------------------------------------------
+# Островная модель ГА
+# -----------------------------------------------------------
+
+def _evolve_island_task(population, seed, island, gens, num_buses, num_drivers, elite):
+    # Одна эпоха острова: поколения gens без обмена особями, у каждого
+    # поколения свой поток spawn_rng(seed, STREAM_ISLAND_GEN, остров, поколение)
+    for gen in gens:
+        population = next_generation(population, num_buses, num_drivers, elite,
+                                     rng=spawn_rng(seed, STREAM_ISLAND_GEN, island, gen))
+    for ind in population:
+        evaluate_schedule(ind)
+    return population
+
+def migrate(islands, migrants):
+    # Кольцо: лучшие migrants особей острова i заменяют худших на острове i+1
+    if migrants <= 0 or len(islands) < 2:
+        return islands
+    best = [select_elites(pop, migrants) for pop in islands]
+    result = []
+    for i, pop in enumerate(islands):
+        incoming = best[i - 1]
+        survivors = sorted(pop, key=evaluate_schedule, reverse=True)
+        result.append(survivors[:len(pop) - len(incoming)] + list(incoming))
+    return result
+
+def run_islands(base_date_str, num_buses, num_drivers, islands=4, pop_size=15,
+                generations=100, migration_interval=5, migrants=1, elite=1,
+                patience=None, time_budget=None, workers=None, seed=None,
+                progress=None, cancel=None, stats=None, days=WEEK_DAYS):
+    # Острова эволюционируют независимо (каждый в своём процессе, если
+    # workers > 1) эпохами по migration_interval поколений, между эпохами
+    # обмениваются лучшими особями. Остановка:
+    #   - после generations поколений;
+    #   - patience поколений без улучшения лучшего фитнеса;
+    #   - time_budget секунд (проверяется между эпохами);
+    #   - по cancel.is_set() (тоже между эпохами).
+    # progress получает GaProgress после каждой эпохи по всем островам.
+    started = time.monotonic()
+    monitor = GaMonitor(generations, progress, cancel, stats)
+    if seed is None:
+        seed = random.getrandbits(64)
+    migration_interval = max(1, migration_interval)
+
+    if workers is not None and workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        run_map = pool.map
+    else:
+        pool = None
+        run_map = map
+
+    if stats is not None:
+        stats.start()
+    try:
+        t0 = time.perf_counter()
+        init_paths = [[(STREAM_ISLAND_INIT, island, i) for i in range(pop_size)]
+                      for island in range(islands)]
+        populations = list(run_map(_init_individuals_task, [seed] * islands, init_paths,
+                                   [base_date_str] * islands,
+                                   [num_buses] * islands, [num_drivers] * islands,
+                                   [days] * islands))
+        if stats is not None:
+            stats.add("init", time.perf_counter() - t0, pop_size * islands)
+
+        monitor.observe(0, [ind for pop in populations for ind in pop])
+        stalled = 0
+        gen = 0
+        while gen < generations:
+            if time_budget is not None and time.monotonic() - started >= time_budget:
+                break
+            if monitor.cancelled():
+                break
+            t0 = time.perf_counter()
+            epoch = min(migration_interval, generations - gen)
+            gens = range(gen, gen + epoch)
+            populations = list(run_map(_evolve_island_task, populations, [seed] * islands,
+                                       range(islands), [gens] * islands,
+                                       [num_buses] * islands, [num_drivers] * islands,
+                                       [elite] * islands))
+            gen += epoch
+            if stats is not None:
+                stats.add("evolve", time.perf_counter() - t0, islands)
+
+            best_before = evaluate_schedule(monitor.best)
+            monitor.observe(gen, [ind for pop in populations for ind in pop])
+            if evaluate_schedule(monitor.best) > best_before:
+                stalled = 0
+            else:
+                stalled += epoch
+                if patience is not None and stalled >= patience:
+                    break
+
+            t0 = time.perf_counter()
+            populations = migrate(populations, migrants)
+            if stats is not None:
+                stats.add("migrate", time.perf_counter() - t0)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if stats is not None:
+            stats.stop()
+
+    return monitor.best
+
+# -----------------------------------------------------------
+# Сохранение и сводка результата
+# -----------------------------------------------------------
+
+CSV_COLUMNS = ["DayIdx", "Date", "Start", "End", "Bus ID", "Driver ID",
+               "DriverType", "Duration", "IsPeak"]
+
+EXPORT_FORMATS = ("csv", "parquet", "arrow")
+_EXPORT_EXTENSIONS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet",
+                      ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow"}
+
+def export_format_for(filename):
+    ext = os.path.splitext(filename)[1].lower()
+    return _EXPORT_EXTENSIONS.get(ext, "csv")
+
+def _arrow_table(records):
+    import pyarrow as pa
+    schema = pa.schema([("DayIdx", pa.int32()), ("Date", pa.string()),
+                        ("Start", pa.string()), ("End", pa.string()),
+                        ("Bus ID", pa.int32()), ("Driver ID", pa.int32()),
+                        ("DriverType", pa.string()), ("Duration", pa.int32()),
+                        ("IsPeak", pa.bool_())])
+    return pa.Table.from_pydict({c: [r[c] for r in records] for c in CSV_COLUMNS},
+                                schema=schema)
+
+class ScheduleWriter:
+    # Пишет расписание порциями (обычно по дню) в CSV, Parquet или
+    # Arrow IPC, не держа всё расписание в памяти. Заодно считает сводку
+    # (см. summary()). Parquet/Arrow требуют пакет pyarrow.
+    def __init__(self, filename, base_date, fmt=None):
+        self.filename = filename
+        self.base_date = base_date
+        self.fmt = fmt or export_format_for(filename)
+        if self.fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Неизвестный формат выгрузки: {self.fmt}")
+        if self.fmt != "csv":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError(f"Для формата {self.fmt} нужен пакет pyarrow")
+        self.total_routes = 0
+        self.peak_routes = 0
+        self.drivers = set()
+        self._file = None
+        self._writer = None
+
+    def __enter__(self):
+        if self.fmt == "csv":
+            self._file = open(self.filename, "w", newline="", encoding="utf-8")
+            self._writer = csv.DictWriter(self._file, fieldnames=CSV_COLUMNS, lineterminator="\n")
+            self._writer.writeheader()
+        return self
+
+    def write_rows(self, rows):
+        if not rows:
+            return
+        self.total_routes += len(rows)
+        self.peak_routes += sum(1 for r in rows if r[ROW_PEAK])
+        self.drivers.update(r[ROW_DRIVER] for r in rows)
+        records = rows_to_records(rows, self.base_date)
+
+        if self.fmt == "csv":
+            self._writer.writerows(records)
+            return
+        table = _arrow_table(records)
+        if self._writer is None:
+            if self.fmt == "parquet":
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self.filename, table.schema)
+            else:
+                import pyarrow as pa
+                self._file = pa.OSFile(self.filename, "wb")
+                self._writer = pa.ipc.new_file(self._file, table.schema)
+        self._writer.write_table(table)
+
+    def __exit__(self, *exc):
+        if self.fmt == "csv":
+            self._file.close()
+            return
+        if self._writer is None:
+            # Пустое расписание -- всё равно создаём файл со схемой
+            table = _arrow_table([])
+            if self.fmt == "parquet":
+                import pyarrow.parquet as pq
+                pq.write_table(table, self.filename)
+            else:
+                import pyarrow as pa
+                with pa.OSFile(self.filename, "wb") as f, pa.ipc.new_file(f, table.schema):
+                    pass
+            return
+        self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+    def summary(self):
+        # По строкам видна только базовая часть фитнеса (без штрафов
+        # VIOLATION_PENALTY и HEADWAY_WEIGHT) -- отсюда "base_fitness"
+        unique_drivers = len(self.drivers)
+        return {
+            "total_routes": self.total_routes,
+            "peak_routes": self.peak_routes,
+            "unique_drivers": unique_drivers,
+            "fitness": schedule_fitness(self.total_routes, self.peak_routes,
+                                        unique_drivers or 1),
+            "base_fitness": True,
+        }
+
+def export_schedule(day_batches, base_date, filename, fmt=None):
+    # day_batches -- итератор списков строк (iter_linear_days, Schedule.iter_days);
+    # возвращает сводку по выгруженному расписанию
+    with ScheduleWriter(filename, base_date, fmt) as writer:
+        for rows in day_batches:
+            writer.write_rows(rows)
+    return writer.summary()
+
+def export_result(schedule, filename, fmt=None):
+    # Выгрузка готового Schedule: fitness в сводке -- evaluate_schedule,
+    # т.е. та же величина, что оптимизировал ГА (со всеми штрафами)
+    summary = export_schedule(schedule.iter_days(), schedule.base_date, filename, fmt)
+    summary["fitness"] = evaluate_schedule(schedule)
+    summary["base_fitness"] = False
+    return summary
+
+def schedule_summary(schedule):
+    if isinstance(schedule, Schedule):
+        total_routes = len(schedule)
+        peak_routes = int(np.count_nonzero(schedule.peak))
+        unique_drivers = len(np.unique(schedule.driver))
+    else:
+        total_routes = len(schedule)
+        peak_routes = sum(1 for r in schedule if r["IsPeak"])
+        unique_drivers = len({r["Driver ID"] for r in schedule})
+    return {
+        "total_routes": total_routes,
+        "peak_routes": peak_routes,
+        "unique_drivers": unique_drivers,
+        "fitness": evaluate_schedule(schedule),
+    }
+
+def format_summary(title, filename, summary):
+    fitness_label = "Fitness"
+    if summary.get("base_fitness") and (VIOLATION_PENALTY or HEADWAY_WEIGHT):
+        fitness_label = "Fitness (без штрафов)"
+    return (f"{title}\n"
+            f"Файл сохранен: {filename}\n\n"
+            f"Всего рейсов: {summary['total_routes']}\n"
+            f"Рейсов в пик: {summary['peak_routes']}\n"
+            f"Уникальных водителей: {summary['unique_drivers']}\n"
+            f"{fitness_label}: {summary['fitness']:.2f}\n")
+
+# -----------------------------------------------------------
+# Кэш сценариев
+# -----------------------------------------------------------
+
+# Увеличивать при изменении алгоритмов, меняющем результат при том же seed
+CACHE_VERSION = 7
+
+def rule_constants():
+    # Правила, от которых зависит расписание; входят в ключ кэша, так что
+    # изменение любой константы делает старые записи недоступными
+    return {
+        "WEEK_DAYS": WEEK_DAYS, "SHIFT_START_HOUR": SHIFT_START_HOUR,
+        "ROUTE_MIN": ROUTE_MIN, "ROUTE_MAX": ROUTE_MAX,
+        "VALID_DAY_ROUTES": list(VALID_DAY_ROUTES),
+        "WORK_HOURS_A": WORK_HOURS_A, "WORK_HOURS_B": WORK_HOURS_B,
+        "LUNCH_TIME_A": to_minutes(LUNCH_TIME_A),
+        "BREAK_INTERVAL_B": to_minutes(BREAK_INTERVAL_B),
+        "SHORT_BREAK_B_RANGE": list(SHORT_BREAK_B_RANGE), "LONG_BREAK_B": LONG_BREAK_B,
+        "BUS_TURNAROUND": BUS_TURNAROUND, "BUS_RETRY_STEP": BUS_RETRY_STEP,
+        "PEAK_INTERVALS": [list(p) for p in PEAK_INTERVALS],
+        "MUTATION_RATE": MUTATION_RATE, "REPAIR_ATTEMPTS": REPAIR_ATTEMPTS,
+        "VIOLATION_PENALTY": VIOLATION_PENALTY,
+        "HEADWAY_WEIGHT": HEADWAY_WEIGHT, "HEADWAY_TARGET": HEADWAY_TARGET,
+    }
+
+def scenario_key(algorithm, base_date_str, num_buses, num_drivers, seed, **params):
+    payload = {
+        "version": CACHE_VERSION,
+        "algorithm": algorithm,
+        "base_date": base_date_str,
+        "buses": num_buses,
+        "drivers": num_drivers,
+        "seed": seed,
+        "params": params,
+        "rules": rule_constants(),
+    }
+    raw = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+class ScenarioCache:
+    # Результаты сценариев по ключу scenario_key(): LRU в памяти
+    # (max_entries расписаний) и, если задан directory, файлы .npz на диске
+    # с вытеснением самых давно использованных сверх max_disk_bytes.
+    def __init__(self, directory=None, max_entries=32, max_disk_bytes=256 * 2**20):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key):
+        with self._lock:
+            schedule = self._memory.get(key)
+            if schedule is not None:
+                self._memory.move_to_end(key)
+                return schedule
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                base_date = datetime.fromisoformat(str(data["base_date"]))
+                schedule = Schedule(base_date, int(data["days"]),
+                                    **{name: data[name] for name in Schedule.COLUMNS})
+            os.utime(path)   # для вытеснения по давности использования
+        except (OSError, KeyError, ValueError):
+            return None
+        self._remember(key, schedule)
+        return schedule
+
+    def put(self, key, schedule):
+        self._remember(key, schedule)
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"   # кэш может писаться из нескольких процессов
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, base_date=np.array(schedule.base_date.isoformat()),
+                                days=np.array(schedule.days), **schedule.columns())
+        os.replace(tmp, path)
+        self._evict_disk()
+
+    def get_or_compute(self, key, compute):
+        schedule = self.get(key)
+        if schedule is None:
+            schedule = compute()
+            self.put(key, schedule)
+        return schedule
+
+    def _remember(self, key, schedule):
+        with self._lock:
+            self._memory[key] = schedule
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+def default_cache_dir():
+    return os.path.join(os.path.expanduser("~"), ".cache", "bus_scheduling")
+
+# -----------------------------------------------------------
+# Тёплый старт ГА: линейные расписания и лучшие прошлых прогонов
+# -----------------------------------------------------------
+
+PERTURB_MOVES = 10   # мутаций на возмущённую копию линейного расписания
+
+class ScheduleStore:
+    # Лучшие расписания прошлых прогонов (до keep штук) для каждого парка:
+    # один файл .npz на (автобусы, водители, дни) с расписаниями подряд
+    # и границами между ними. Правила (rule_constants) входят в имя
+    # файла, так что после их изменения старые расписания не подхватываются.
+    # Дни в расписании считаются от начальной даты, а пики зависят только
+    # от номера дня, поэтому расписание подходит и для другой даты.
+    def __init__(self, directory, keep=4):
+        self.directory = directory
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, num_buses, num_drivers, days):
+        payload = {"version": CACHE_VERSION, "rules": rule_constants(), "days": days}
+        key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16]
+        return os.path.join(self.directory,
+                            f"best_{num_buses}x{num_drivers}_{days}d_{key}.npz")
+
+    def load(self, num_buses, num_drivers, days, base_date):
+        # Расписания от лучшего к худшему (пустой список, если файла нет)
+        try:
+            with np.load(self._path(num_buses, num_drivers, days)) as data:
+                columns = {name: data[name] for name in Schedule.COLUMNS}
+                bounds = data["bounds"].tolist()
+        except (OSError, KeyError, ValueError):
+            return []
+        return [Schedule(base_date, days,
+                         **{name: col[lo:hi] for name, col in columns.items()})
+                for lo, hi in zip(bounds, bounds[1:])]
+
+    def save(self, num_buses, num_drivers, days, schedules):
+        # Добавляет расписания к сохранённым и оставляет keep лучших
+        if not schedules:
+            return
+        base_date = schedules[0].base_date
+        unique = {}
+        for sched in self.load(num_buses, num_drivers, days, base_date) + list(schedules):
+            digest = hashlib.sha256(b"".join(col.tobytes() for col in
+                                             sched.columns().values())).digest()
+            unique.setdefault(digest, sched)
+        best = sorted(unique.values(), key=evaluate_schedule, reverse=True)[:self.keep]
+        bounds = np.cumsum([0] + [len(sched) for sched in best])
+        merged = Schedule.concat(best)
+        path = self._path(num_buses, num_drivers, days)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, bounds=bounds, **merged.columns())
+        os.replace(tmp, path)
+
+def perturb_schedule(schedule, num_buses, num_drivers, moves=PERTURB_MOVES, rng=random):
+    # Копия с moves мутациями (удаление рейса или новое назначение с
+    # проверкой ограничений, см. mutate)
+    copy = schedule.take(np.arange(len(schedule)))
+    for _ in range(moves):
+        mutate(copy, num_buses, num_drivers, mutation_rate=1.0, rng=rng)
+    return copy
+
+def warm_start_population(base_date_str, num_buses, num_drivers, count,
+                          days=WEEK_DAYS, store=None, rng=random):
+    # count особей для начальной популяции ГА: сохранённые лучшие (если
+    # есть store), линейное расписание и его возмущённые копии. Все они
+    # проходят validate_schedule: непрошедшие отбрасываются, копия
+    # перестраивается (до REPAIR_ATTEMPTS раз, потом берётся само
+    # линейное расписание).
+    base_date = datetime.strptime(base_date_str, "%Y-%m-%d")
+    population = []
+    if store is not None:
+        stored = store.load(num_buses, num_drivers, days, base_date)
+        population += [sched for sched in stored if violation_count(sched) == 0][:count]
+    if len(population) < count:
+        rows = build_days_rows(linear_day_rows, num_buses, num_drivers, days, rng=rng)
+        linear = Schedule.from_rows(rows, base_date, days)
+        population.append(linear)
+        while len(population) < count:
+            for _ in range(REPAIR_ATTEMPTS):
+                copy = perturb_schedule(linear, num_buses, num_drivers, rng=rng)
+                if violation_count(copy) == 0:
+                    break
+            else:
+                copy = linear
+            population.append(copy)
+    return population
+
+def run_scenario(algorithm, base_date_str, num_buses, num_drivers, days=WEEK_DAYS,
+                 pop_size=15, generations=20, seed=None, workers=None, cache=None,
+                 warm_start=0, store=None, **ga_kwargs):
+    # Расписание сценария как Schedule. С cache и seed результат берётся из
+    # кэша, если такой сценарий уже считали (без seed прогоны случайны и
+    # не кэшируются). workers на результат не влияет (с seed у каждой
+    # особи и каждого дня свой поток, см. spawn_rng) и в ключ не входит.
+    # ГА: warm_start особей начальной популяции берутся из
+    # warm_start_population; со store туда же сохраняется лучшая особь.
+    # Результат тогда зависит от содержимого store и не кэшируется.
+    # С ga_kwargs["stats"] прогон нужен ради замеров, поэтому кэш не
+    # читается (результат в него всё равно записывается).
+    if algorithm == "linear":
+        def compute():
+            rows = build_days_rows(linear_day_rows, num_buses, num_drivers,
+                                   days, workers, seed)
+            base_date = datetime.strptime(base_date_str, "%Y-%m-%d")
+            return Schedule.from_rows(rows, base_date, days)
+        params = {"days": days}
+    elif algorithm == "genetic":
+        def compute():
+            initial = None
+            if warm_start > 0:
+                rng = random if seed is None else spawn_rng(seed, STREAM_WARM_START)
+                initial = warm_start_population(base_date_str, num_buses, num_drivers,
+                                                min(warm_start, pop_size), days,
+                                                store, rng)
+            best = run_genetic(base_date_str, num_buses, num_drivers, pop_size,
+                               generations, workers, seed, initial=initial, days=days,
+                               **ga_kwargs)
+            if store is not None:
+                store.save(num_buses, num_drivers, days, [best])
+            return best
+        params = {"days": days, "pop_size": pop_size, "generations": generations,
+                  "elite": ga_kwargs.get("elite", 0), "warm_start": warm_start}
+    else:
+        raise ValueError(f"Неизвестный алгоритм: {algorithm}")
+
+    if cache is None or seed is None or store is not None:
+        return compute()
+    key = scenario_key(algorithm, base_date_str, num_buses, num_drivers, seed, **params)
+    schedule = None if ga_kwargs.get("stats") is not None else cache.get(key)
+    if schedule is None:
+        schedule = compute()
+        cancel = ga_kwargs.get("cancel")
+        if not (cancel is not None and cancel.is_set()):   # прерванный прогон не кэшируем
+            cache.put(key, schedule)
+    return schedule
 
-    for gen in range(generations):
-        new_pop = []
-        for _ in range(pop_size):
-            p1 = select_parent(population)
-            p2 = select_parent(population)
-            child = crossover(p1, p2)
-            child = mutate(child, num_buses, num_drivers)
-            new_pop.append(child)
-        population = new_pop
+# -----------------------------------------------------------
+# Серии сценариев (what-if, Монте-Карло)
+# -----------------------------------------------------------
 
-    best_ind = max(population, key=evaluate_schedule)
-    return best_ind
+SWEEP_COLUMNS = ["algorithm", "date", "buses", "drivers", "seed",
+                 "total_routes", "peak_routes", "unique_drivers", "fitness", "elapsed"]
+
+def sweep_grid(algorithms=("linear",), dates=("2024-01-01",), buses=(5,),
+               drivers=(12,), replications=1, seed=None):
+    # Все сочетания параметров, по replications прогонов на каждое.
+    # С seed у каждого сценария свой seed spawn_seed(seed, STREAM_SWEEP, i),
+    # и вся серия воспроизводима; без seed прогоны случайны.
+    scenarios = []
+    combos = itertools.product(algorithms, dates, buses, drivers, range(replications))
+    for i, (algorithm, date, nb, nd, _) in enumerate(combos):
+        scenarios.append({
+            "algorithm": algorithm, "date": date, "buses": nb, "drivers": nd,
+            "seed": None if seed is None else spawn_seed(seed, STREAM_SWEEP, i),
+        })
+    return scenarios
+
+_sweep_cache = None
+
+def _sweep_worker_init(cache_dir):
+    # Один кэш на рабочий процесс на всю серию
+    global _sweep_cache
+    _sweep_cache = ScenarioCache(cache_dir) if cache_dir else None
+
+def _sweep_task(scenario, days, pop_size, generations, ga_kwargs):
+    t0 = time.perf_counter()
+    schedule = run_scenario(scenario["algorithm"], scenario["date"], scenario["buses"],
+                            scenario["drivers"], days, pop_size, generations,
+                            scenario["seed"], None, _sweep_cache, **ga_kwargs)
+    result = dict(scenario)
+    result.update(schedule_summary(schedule))
+    result["elapsed"] = time.perf_counter() - t0
+    return result
+
+def run_sweep(scenarios, workers=None, days=WEEK_DAYS, pop_size=15, generations=20,
+              cache_dir=None, **ga_kwargs):
+    # Отдаёт метрики сценариев (словари с ключами SWEEP_COLUMNS) по порядку,
+    # по мере готовности. Все сценарии идут через один пул процессов;
+    # в работе одновременно не больше 2*workers сценариев. Каждый сценарий
+    # считается в одном процессе (workers внутри сценария не используется).
+    if workers is None or workers <= 1:
+        _sweep_worker_init(cache_dir)
+        for scenario in scenarios:
+            yield _sweep_task(scenario, days, pop_size, generations, ga_kwargs)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_sweep_worker_init,
+                             initargs=(cache_dir,)) as pool:
+        pending = deque()
+        for scenario in scenarios:
+            pending.append(pool.submit(_sweep_task, scenario, days, pop_size,
+                                       generations, ga_kwargs))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def write_sweep_table(results, filename, on_result=None):
+    # Пишет результаты серии в CSV построчно, по мере поступления;
+    # on_result(result) -- например, для вывода прогресса. Возвращает
+    # число сценариев.
+    count = 0
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=SWEEP_COLUMNS, lineterminator="\n",
+                                extrasaction="ignore")
+        writer.writeheader()
+        for result in results:
+            row = dict(result)
+            row["fitness"] = f"{row['fitness']:.2f}"
+            row["elapsed"] = f"{row['elapsed']:.3f}"
+            writer.writerow(row)
+            f.flush()
+            count += 1
+            if on_result is not None:
+                on_result(result)
+    return count
 
 # -----------------------------------------------------------
-# GUI на tkinter
+# GUI на tkinter (импортируется только при запуске окна)
 # -----------------------------------------------------------
 
 class AppGUI:
     def __init__(self, root):
+        import tkinter as tk
+        from tkinter import ttk
+
         self.root = root
         self.root.title("Bus Scheduling GUI")
 
@@ -457,6 +2156,20 @@ class AppGUI:
         self.drivers_entry = ttk.Entry(params_frame, textvariable=self.drivers_var, width=10)
         self.drivers_entry.grid(row=2, column=1, pady=5)
 
+        # Файл результата (.csv, .parquet или .arrow); пусто -- имя по умолчанию
+        ttk.Label(params_frame, text="Файл результата:").grid(row=3, column=0, sticky="w")
+        self.output_var = tk.StringVar(value="")
+        self.output_entry = ttk.Entry(params_frame, textvariable=self.output_var, width=30)
+        self.output_entry.grid(row=3, column=1, pady=5)
+
+        # Seed: пусто -- случайный прогон; с seed одинаковые сценарии
+        # берутся из кэша (в памяти и в default_cache_dir())
+        ttk.Label(params_frame, text="Seed (необязательно):").grid(row=4, column=0, sticky="w")
+        self.seed_var = tk.StringVar(value="")
+        self.seed_entry = ttk.Entry(params_frame, textvariable=self.seed_var, width=10)
+        self.seed_entry.grid(row=4, column=1, pady=5)
+        self.cache = ScenarioCache(default_cache_dir())
+
         # Кнопки для запуска алгоритмов
         buttons_frame = ttk.Frame(root)
         buttons_frame.grid(row=1, column=0, padx=10, pady=5, sticky="w")
@@ -467,6 +2180,19 @@ class AppGUI:
         self.run_ga_btn = ttk.Button(buttons_frame, text="Генетический алгоритм", command=self.run_ga_algorithm)
         self.run_ga_btn.grid(row=0, column=1, padx=5)
 
+        self.cancel_ga_btn = ttk.Button(buttons_frame, text="Остановить ГА", command=self.cancel_ga_algorithm,
+                                        state="disabled")
+        self.cancel_ga_btn.grid(row=0, column=2, padx=5)
+
+        # Замеры ГА по фазам (выводятся под результатом)
+        self.ga_stats_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(buttons_frame, text="Замеры ГА", variable=self.ga_stats_var).grid(row=0, column=3, padx=5)
+
+        # ГА считается в фоновом потоке и шлёт сообщения в очередь,
+        # которую окно опрашивает через root.after
+        self.ga_queue = queue.Queue()
+        self.ga_cancel = None
+
         # Вывод результатов
         output_frame = ttk.LabelFrame(root, text=" Результат ")
         output_frame.grid(row=2, column=0, padx=10, pady=10, sticky="nw")
@@ -474,74 +2200,270 @@ class AppGUI:
         self.output_text = tk.Text(output_frame, width=80, height=20)
         self.output_text.pack(padx=5, pady=5)
 
+    def get_seed(self):
+        value = self.seed_var.get().strip()
+        return int(value) if value else None
+
+    def show_text(self, text):
+        self.output_text.delete("1.0", "end")
+        self.output_text.insert("end", text)
+
+    def show_error(self, e):
+        from tkinter import messagebox
+        messagebox.showerror("Ошибка", str(e))
+
     def run_direct_algorithm(self):
         try:
             base_date_str = self.date_entry.get().strip()
             num_buses = int(self.buses_var.get())
             num_drivers = int(self.drivers_var.get())
 
-            schedule = generate_linear_schedule_week(base_date_str, num_buses, num_drivers)
-            df = pd.DataFrame(schedule)
-            filename = "linear_schedule_week_gui.csv"
-            df.to_csv(filename, index=False)
+            seed = self.get_seed()
 
-            total_routes = len(df)
-            peak_routes = df["IsPeak"].sum()
-            unique_drivers = df["Driver ID"].nunique()
-            fit = evaluate_schedule(schedule)
+            filename = self.output_var.get().strip() or "linear_schedule_week_gui.csv"
+            if seed is None:
+                base_date, batches = iter_linear_days(base_date_str, num_buses, num_drivers)
+                summary = export_schedule(batches, base_date, filename)
+            else:
+                schedule = run_scenario("linear", base_date_str, num_buses, num_drivers,
+                                        seed=seed, cache=self.cache)
+                summary = export_result(schedule, filename)
 
             # Выводим результат в текстовое поле
-            self.output_text.delete("1.0", tk.END)
-            self.output_text.insert(tk.END, f"ЛИНЕЙНЫЙ АЛГОРИТМ\n")
-            self.output_text.insert(tk.END, f"Файл сохранен: {filename}\n\n")
-            self.output_text.insert(tk.END, f"Всего рейсов: {total_routes}\n")
-            self.output_text.insert(tk.END, f"Рейсов в пик: {peak_routes}\n")
-            self.output_text.insert(tk.END, f"Уникальных водителей: {unique_drivers}\n")
-            self.output_text.insert(tk.END, f"Fitness: {fit:.2f}\n")
+            self.show_text(format_summary("ЛИНЕЙНЫЙ АЛГОРИТМ", filename, summary))
 
         except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
+            self.show_error(e)
 
     def run_ga_algorithm(self):
+        if self.ga_cancel is not None:
+            return   # уже идёт
         try:
             base_date_str = self.date_entry.get().strip()
             num_buses = int(self.buses_var.get())
             num_drivers = int(self.drivers_var.get())
-
-            # Параметры ГА можно ввести дополнительно в GUI,
-            # для примера возьмём фиксированные
-            pop_size = 15
-            generations = 20
-
-            best_ind = run_genetic(base_date_str, num_buses, num_drivers, pop_size, generations)
-            df = pd.DataFrame(best_ind)
-            filename = "best_genetic_schedule_week_gui.csv"
-            df.to_csv(filename, index=False)
-
-            total_routes = len(df)
-            peak_routes = df["IsPeak"].sum()
-            unique_drivers = df["Driver ID"].nunique()
-            fit = evaluate_schedule(best_ind)
-
-            self.output_text.delete("1.0", tk.END)
-            self.output_text.insert(tk.END, f"ГЕНЕТИЧЕСКИЙ АЛГОРИТМ\n")
-            self.output_text.insert(tk.END, f"Файл сохранен: {filename}\n\n")
-            self.output_text.insert(tk.END, f"Всего рейсов: {total_routes}\n")
-            self.output_text.insert(tk.END, f"Рейсов в пик: {peak_routes}\n")
-            self.output_text.insert(tk.END, f"Уникальных водителей: {unique_drivers}\n")
-            self.output_text.insert(tk.END, f"Fitness: {fit:.2f}\n")
-
+            seed = self.get_seed()
         except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
+            self.show_error(e)
+            return
+
+        # Параметры ГА можно ввести дополнительно в GUI,
+        # для примера возьмём фиксированные
+        pop_size = 15
+        generations = 20
+
+        filename = self.output_var.get().strip() or "best_genetic_schedule_week_gui.csv"
+        stats = GaStats() if self.ga_stats_var.get() else None
+        self.ga_cancel = threading.Event()
+        self.run_ga_btn.config(state="disabled")
+        self.cancel_ga_btn.config(state="normal")
+        self.show_text("ГЕНЕТИЧЕСКИЙ АЛГОРИТМ\n")
+
+        def worker(cancel=self.ga_cancel, out=self.ga_queue):
+            try:
+                best_ind = run_scenario("genetic", base_date_str, num_buses, num_drivers,
+                                        pop_size=pop_size, generations=generations,
+                                        seed=seed, cache=self.cache,
+                                        progress=lambda p: out.put(("progress", p)),
+                                        cancel=cancel, stats=stats)
+                out.put(("done", (best_ind, filename, stats)))
+            except Exception as e:
+                out.put(("error", e))
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(100, self.poll_ga_queue)
+
+    def cancel_ga_algorithm(self):
+        if self.ga_cancel is not None:
+            self.ga_cancel.set()
+            self.cancel_ga_btn.config(state="disabled")
+
+    def poll_ga_queue(self):
+        while True:
+            try:
+                kind, payload = self.ga_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                self.output_text.insert("end",
+                    f"Поколение {payload.generation}/{payload.generations}: "
+                    f"лучший {payload.best_fitness:.2f}, средний {payload.mean_fitness:.2f}, "
+                    f"{payload.elapsed:.1f} с\n")
+                self.output_text.see("end")
+            else:
+                self.finish_ga(kind, payload)
+                return
+        self.root.after(100, self.poll_ga_queue)
+
+    def finish_ga(self, kind, payload):
+        cancelled = self.ga_cancel.is_set()
+        self.ga_cancel = None
+        self.run_ga_btn.config(state="normal")
+        self.cancel_ga_btn.config(state="disabled")
+        if kind == "error":
+            self.show_error(payload)
+            return
+        try:
+            best_ind, filename, stats = payload
+            summary = export_result(best_ind, filename)
+            title = "ГЕНЕТИЧЕСКИЙ АЛГОРИТМ" + (" (остановлен)" if cancelled else "")
+            text = format_summary(title, filename, summary)
+            if stats is not None:
+                text += "\n" + stats.report()
+            self.show_text(text)
+        except Exception as e:
+            self.show_error(e)
 
 
 # -----------------------------------------------------------
-# Точка входа
+# Запуск без GUI (командная строка)
 # -----------------------------------------------------------
-def main():
+
+ALGORITHMS = ("linear", "genetic")
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Расписание маршруток. Без аргументов запускается GUI, "
+                    "с любым параметром -- расчёт без окна (--headless).")
+    parser.add_argument("--headless", action="store_true",
+                        help="посчитать расписание без окна и сохранить в файл "
+                             "(подразумевается при любом другом параметре)")
+    parser.add_argument("--date", default="2024-01-01", help="начальная дата YYYY-MM-DD")
+    parser.add_argument("--buses", type=int, default=5, help="кол-во маршруток")
+    parser.add_argument("--drivers", type=int, default=12, help="кол-во водителей")
+    parser.add_argument("--algorithm", choices=ALGORITHMS, default="linear")
+    parser.add_argument("--days", type=int, default=WEEK_DAYS, help="горизонт в днях")
+    parser.add_argument("--pop-size", type=int, default=15)
+    parser.add_argument("--generations", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="число процессов (по умолчанию -- без пула)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default=None,
+                        help="путь к файлу результата (формат -- по расширению)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default=None,
+                        help="csv, parquet или arrow (по умолчанию -- по расширению)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="каталог кэша сценариев (работает только с --seed)")
+    parser.add_argument("--stats", action="store_true",
+                        help="ГА: время по фазам (init, select, crossover, ...)")
+    parser.add_argument("--profile", action="store_true",
+                        help="ГА: то же плюс cProfile и пиковая память")
+    parser.add_argument("--warm-start", type=int, default=0, metavar="N",
+                        help="ГА: N особей начальной популяции из линейного "
+                             "расписания и лучших прошлых прогонов")
+    parser.add_argument("--store-dir", default=None,
+                        help="ГА: каталог лучших расписаний по паркам "
+                             "(читается при --warm-start, пополняется после прогона)")
+    sweep = parser.add_argument_group("серия сценариев (--sweep)")
+    sweep.add_argument("--sweep", action="store_true",
+                       help="посчитать все сочетания параметров и сохранить таблицу метрик")
+    sweep.add_argument("--sweep-algorithms", type=parse_str_list, default=None,
+                       help="через запятую, по умолчанию -- --algorithm")
+    sweep.add_argument("--sweep-dates", type=parse_str_list, default=None,
+                       help="через запятую, по умолчанию -- --date")
+    sweep.add_argument("--sweep-buses", type=parse_int_list, default=None,
+                       help="через запятую, по умолчанию -- --buses")
+    sweep.add_argument("--sweep-drivers", type=parse_int_list, default=None,
+                       help="через запятую, по умолчанию -- --drivers")
+    sweep.add_argument("--replications", type=int, default=1,
+                       help="прогонов на каждое сочетание")
+    return parser
+
+def parse_str_list(value):
+    return [x.strip() for x in value.split(",") if x.strip()]
+
+def parse_int_list(value):
+    return [int(x) for x in parse_str_list(value)]
+
+def run_headless(args):
+    ext = "." + (args.format or "csv")
+    stats = None
+    cache = ScenarioCache(args.cache_dir) if args.cache_dir else None
+    if args.algorithm == "linear" and (cache is None or args.seed is None):
+        title = "ЛИНЕЙНЫЙ АЛГОРИТМ"
+        filename = args.output or "linear_schedule_week" + ext
+        # Пишем по дням, по мере построения
+        base_date, batches = iter_linear_days(args.date, args.buses, args.drivers,
+                                              args.days, args.workers, args.seed)
+        summary = export_schedule(batches, base_date, filename, args.format)
+    else:
+        if args.algorithm == "linear":
+            title = "ЛИНЕЙНЫЙ АЛГОРИТМ"
+            filename = args.output or "linear_schedule_week" + ext
+            ga_kwargs = {}
+        else:
+            title = "ГЕНЕТИЧЕСКИЙ АЛГОРИТМ"
+            filename = args.output or "best_genetic_schedule_week" + ext
+            if args.stats or args.profile:
+                stats = GaStats(profile=args.profile, trace_memory=args.profile)
+            store = ScheduleStore(args.store_dir) if args.store_dir else None
+            ga_kwargs = {"stats": stats, "warm_start": args.warm_start, "store": store}
+        schedule = run_scenario(args.algorithm, args.date, args.buses, args.drivers,
+                                args.days, args.pop_size, args.generations,
+                                args.seed, args.workers, cache, **ga_kwargs)
+        summary = export_result(schedule, filename, args.format)
+    print(format_summary(title, filename, summary), end="")
+    if stats is not None:
+        print("\n" + stats.report(), end="")
+        if stats.profile_text:
+            print("\n" + stats.profile_text, end="")
+    return summary
+
+def run_sweep_headless(args):
+    algorithms = args.sweep_algorithms or [args.algorithm]
+    for algorithm in algorithms:
+        if algorithm not in ALGORITHMS:
+            raise SystemExit(f"Неизвестный алгоритм: {algorithm}")
+    scenarios = sweep_grid(algorithms,
+                           args.sweep_dates or [args.date],
+                           args.sweep_buses or [args.buses],
+                           args.sweep_drivers or [args.drivers],
+                           args.replications, args.seed)
+    filename = args.output or "sweep_results.csv"
+    total = len(scenarios)
+    done = itertools.count(1)
+
+    def report(result):
+        print(f"[{next(done)}/{total}] {result['algorithm']} {result['date']} "
+              f"автобусов={result['buses']} водителей={result['drivers']}: "
+              f"рейсов={result['total_routes']} fitness={result['fitness']:.2f}")
+
+    results = run_sweep(scenarios, args.workers, args.days, args.pop_size,
+                        args.generations, args.cache_dir)
+    count = write_sweep_table(results, filename, report)
+    print(f"\nСценариев: {count}\nФайл сохранен: {filename}")
+    return count
+
+def run_gui():
+    import tkinter as tk
     root = tk.Tk()
     app = AppGUI(root)
     root.mainloop()
 
+# -----------------------------------------------------------
+# Точка входа
+# -----------------------------------------------------------
+SWEEP_OPTIONS = ("sweep_algorithms", "sweep_dates", "sweep_buses",
+                 "sweep_drivers", "replications")
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    # GUI параметров командной строки не читает, поэтому любой параметр
+    # означает расчёт без окна (а параметр серии -- серию), а не
+    # молчаливый запуск окна, которое без дисплея ещё и упадёт
+    if any(getattr(args, name) != parser.get_default(name) for name in SWEEP_OPTIONS):
+        args.sweep = True
+    if argv:
+        args.headless = True
+    if args.sweep:
+        run_sweep_headless(args)
+    elif args.headless:
+        run_headless(args)
+    else:
+        run_gui()
+
 if __name__ == "__main__":
     main()
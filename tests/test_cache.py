@@ -0,0 +1,32 @@
+import main
+
+def fingerprint(schedule):
+    return main.evaluate_schedule(schedule), schedule.rows()
+
+def test_genetic_cache_hit_matches_fresh_run_with_workers(tmp_path):
+    cache = main.ScenarioCache(str(tmp_path))
+    sequential = main.run_scenario("genetic", "2024-01-01", 5, 12, pop_size=6,
+                                   generations=3, seed=3, cache=cache)
+    cached = main.run_scenario("genetic", "2024-01-01", 5, 12, pop_size=6,
+                               generations=3, seed=3, workers=2,
+                               cache=main.ScenarioCache(str(tmp_path)))
+    fresh = main.run_scenario("genetic", "2024-01-01", 5, 12, pop_size=6,
+                              generations=3, seed=3, workers=2)
+    assert fingerprint(sequential) == fingerprint(cached) == fingerprint(fresh)
+
+def test_rule_change_misses_cache(monkeypatch):
+    key = main.scenario_key("linear", "2024-01-01", 5, 12, 1, days=7)
+    monkeypatch.setattr(main, "BUS_TURNAROUND", main.BUS_TURNAROUND + 1)
+    assert main.scenario_key("linear", "2024-01-01", 5, 12, 1, days=7) != key
+
+def test_stats_run_bypasses_cache_hit(tmp_path):
+    cache = main.ScenarioCache(str(tmp_path))
+    args = ("genetic", "2024-01-01", 4, 8)
+    kwargs = dict(pop_size=4, generations=2, seed=5, cache=cache)
+    first = main.run_scenario(*args, **kwargs)
+    stats = main.GaStats()
+    again = main.run_scenario(*args, stats=stats, **kwargs)
+    # Замеры описывают настоящий прогон, а не попадание в кэш
+    assert stats.total_time > 0 and len(stats.generations) == 3   # 0..2
+    assert stats.phase_calls.get("init") == 4
+    assert fingerprint(again) == fingerprint(first)
@@ -0,0 +1,20 @@
+import main
+
+def test_options_imply_headless(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(main, "run_gui", lambda: calls.append("gui"))
+    monkeypatch.setattr(main, "run_headless", lambda args: calls.append(("headless", args)))
+    monkeypatch.setattr(main, "run_sweep_headless", lambda args: calls.append(("sweep", args)))
+    main.main([])
+    main.main(["--algorithm", "genetic", "--output", str(tmp_path / "x.csv")])
+    main.main(["--days", str(main.WEEK_DAYS)])
+    main.main(["--sweep-buses", "3,5"])
+    assert calls[0] == "gui"
+    assert [c[0] for c in calls[1:]] == ["headless", "headless", "sweep"]
+    assert calls[1][1].output == str(tmp_path / "x.csv")
+
+def test_headless_without_flag_writes_file(tmp_path):
+    out = tmp_path / "g.csv"
+    main.main(["--algorithm", "genetic", "--seed", "1", "--pop-size", "4",
+               "--generations", "1", "--output", str(out)])
+    assert out.read_text(encoding="utf-8").startswith(",".join(main.CSV_COLUMNS))
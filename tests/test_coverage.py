@@ -0,0 +1,104 @@
+import random
+from datetime import datetime
+
+import numpy as np
+
+import main
+
+def brute_headway(starts, lo, hi):
+    starts = sorted(s for s in starts if lo <= s <= hi)
+    if not starts:
+        return hi - lo
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    return max([starts[0] - lo, hi - starts[-1]] + gaps)
+
+def brute_in_service(starts, ends, minute):
+    return sum(1 for s, e in zip(starts, ends) if s <= minute < e)
+
+def evolved_population(seed=3, generations=20):
+    rng = random.Random(seed)
+    population = [main.valid_week_schedule("2024-01-01", 6, 15, rng=rng) for _ in range(10)]
+    for ind in population:
+        for day_idx in range(main.WEEK_DAYS):
+            ind.day_coverage(day_idx)
+    for _ in range(generations):
+        population = [main.mutate(main.crossover(main.select_parent(population, rng),
+                                                 main.select_parent(population, rng)),
+                                  6, 15, mutation_rate=1.0, rng=rng)
+                      for _ in range(10)]
+    return population
+
+def test_incremental_coverage_matches_rebuild_and_brute_force():
+    rng = random.Random(0)
+    for ind in evolved_population():
+        for day_idx in range(main.WEEK_DAYS):
+            sl = ind.day_slice(day_idx)
+            starts, ends = ind.start[sl].tolist(), ind.end[sl].tolist()
+            cov = ind.day_coverage(day_idx)
+            fresh = main.DayCoverage.from_arrays(ind.start[sl], ind.end[sl])
+            for name in main.DayCoverage.__slots__:
+                assert np.array_equal(getattr(cov, name), getattr(fresh, name))
+            assert cov.max_headway() == brute_headway(starts, 0, main.DAY_MINUTES)
+            for _ in range(20):
+                lo = rng.randint(0, main.DAY_MINUTES)
+                hi = rng.randint(lo, main.DAY_MINUTES)
+                minute = rng.randint(0, main.DAY_MINUTES)
+                assert cov.max_headway(lo, hi) == brute_headway(starts, lo, hi)
+                assert cov.in_service(minute) == brute_in_service(starts, ends, minute)
+
+def test_add_remove_round_trip():
+    cov = main.DayCoverage.from_arrays(np.array([100, 400]), np.array([160, 450]))
+    assert cov.max_headway() == main.DAY_MINUTES - 400 and cov.in_service(120) == 1
+    assert cov.max_headway(100, 400) == 300
+    cov.add(200, 260)
+    assert cov.max_headway(100, 400) == 200 and cov.in_service(220) == 1
+    cov.remove(200, 260)
+    assert cov.max_headway(100, 400) == 300 and cov.in_service(220) == 0
+
+def test_headway_penalty_counts_empty_trailing_days(monkeypatch):
+    monkeypatch.setattr(main, "HEADWAY_TARGET", 30)
+    base = datetime(2024, 1, 1)
+    def full_day(day):
+        # отправления каждые 30 минут -- штрафа за день нет
+        return [(day, m, m + 1, 1, 2, main.DRIVER_TYPE_A, False)
+                for m in range(0, main.DAY_MINUTES + 1, 30)]
+    rows = full_day(0) + full_day(1) + full_day(2)
+    early = main.Schedule.from_rows(rows, base)
+    late = main.Schedule.from_rows(rows + full_day(6), base)
+    # Пустые дни 3..6 в конце штрафуются, как и пустые 3..5 в середине
+    empty_day = main.DAY_MINUTES - main.HEADWAY_TARGET
+    assert main.headway_penalty(late) == 3 * empty_day
+    assert main.headway_penalty(early) - main.headway_penalty(late) == empty_day
+
+def test_headway_penalty_uses_schedule_horizon(monkeypatch):
+    monkeypatch.setattr(main, "HEADWAY_TARGET", 30)
+    monkeypatch.setattr(main, "HEADWAY_WEIGHT", 1.0)
+    base = datetime(2024, 1, 1)
+    empty_day = main.DAY_MINUTES - main.HEADWAY_TARGET
+    rows = [(day, m, m + 1, 1, 2, main.DRIVER_TYPE_A, False)
+            for day in range(8) for m in range(0, main.DAY_MINUTES + 1, 30)]
+    # days=10: пустые дни 8 и 9 штрафуются; days=3: дней 3..6 нет вовсе
+    ten = main.Schedule.from_rows(rows, base, days=10)
+    assert main.headway_penalty(ten) == 2 * empty_day
+    three = main.Schedule.from_rows([r for r in rows if r[0] < 3], base, days=3)
+    assert main.headway_penalty(three) == 0
+    # Горизонт переживает take/concat/упаковку для процессов и кэш
+    child = main.crossover(ten, ten)
+    assert child.days == 10
+    assert main.evaluate_schedule(child) == main.evaluate_schedule(ten.take(slice(None)))
+    assert [ind.days for ind in main.unpack_population(main.pack_population([ten, ten]))] == [10, 10]
+
+def test_genetic_individuals_carry_days():
+    best = main.run_genetic("2024-01-01", 4, 8, pop_size=4, generations=2, seed=1, days=10)
+    assert best.days == 10
+
+def test_reported_fitness_includes_headway_penalty(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "HEADWAY_WEIGHT", 1.0)
+    schedule = main.valid_week_schedule("2024-01-01", 3, 6, days=10, seed=2)
+    summary = main.export_result(schedule, str(tmp_path / "s.csv"))
+    assert summary["fitness"] == main.evaluate_schedule(schedule) < 0
+    assert "Fitness: " in main.format_summary("T", "s.csv", summary)
+    # Потоковая выгрузка видит только базовую часть -- так и подписана
+    base_date, batches = main.iter_linear_days("2024-01-01", 3, 6, seed=2)
+    streamed = main.export_schedule(batches, base_date, str(tmp_path / "l.csv"))
+    assert "Fitness (без штрафов): " in main.format_summary("T", "l.csv", streamed)
@@ -0,0 +1,33 @@
+import main
+
+WORKERS = (None, 1, 2)
+
+def fingerprint(schedule):
+    if isinstance(schedule, main.Schedule):
+        return main.evaluate_schedule(schedule), schedule.rows()
+    return schedule
+
+def assert_same_for_all_workers(run):
+    results = [fingerprint(run(workers)) for workers in WORKERS]
+    assert results[0] == results[1] == results[2]
+    return results[0]
+
+def test_linear_week_independent_of_workers():
+    result = assert_same_for_all_workers(lambda workers: main.generate_linear_schedule_week(
+        "2024-01-01", 5, 12, days=9, workers=workers, seed=11))
+    assert {r["DayIdx"] for r in result} == set(range(9))
+
+def test_valid_week_independent_of_workers():
+    result = assert_same_for_all_workers(lambda workers: main.generate_valid_week(
+        "2024-01-01", 5, 12, days=10, workers=workers, seed=11))
+    assert {r["DayIdx"] for r in result} == set(range(10))
+
+def test_genetic_independent_of_workers():
+    assert_same_for_all_workers(lambda workers: main.run_genetic(
+        "2024-01-01", 4, 8, pop_size=6, generations=3, workers=workers, seed=7,
+        elite=1, days=8))
+
+def test_islands_independent_of_workers():
+    assert_same_for_all_workers(lambda workers: main.run_islands(
+        "2024-01-01", 4, 8, islands=3, pop_size=4, generations=4,
+        migration_interval=2, workers=workers, seed=7))
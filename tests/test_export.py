@@ -0,0 +1,56 @@
+import csv
+
+import pytest
+
+import main
+
+def expected_records():
+    schedule = main.valid_week_schedule("2024-01-01", 4, 10, days=3, seed=4)
+    return schedule, schedule.to_records()
+
+def read_csv(path):
+    types = {"DayIdx": int, "Bus ID": int, "Driver ID": int, "Duration": int,
+             "IsPeak": lambda v: v == "True"}
+    with open(path, newline="", encoding="utf-8") as f:
+        return [{k: types.get(k, str)(v) for k, v in row.items()}
+                for row in csv.DictReader(f)]
+
+def read_arrow(path, fmt):
+    pa = pytest.importorskip("pyarrow")
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        table = pq.read_table(path)
+    else:
+        with pa.memory_map(str(path)) as source:
+            table = pa.ipc.open_file(source).read_all()
+    assert table.column_names == main.CSV_COLUMNS
+    return table.to_pylist()
+
+@pytest.mark.parametrize("fmt", main.EXPORT_FORMATS)
+def test_export_round_trip(tmp_path, fmt):
+    if fmt != "csv":
+        pytest.importorskip("pyarrow")
+    schedule, records = expected_records()
+    path = tmp_path / f"schedule.{fmt}"
+    summary = main.export_result(schedule, str(path), fmt)
+    back = read_csv(path) if fmt == "csv" else read_arrow(path, fmt)
+    assert back == records
+    assert summary["total_routes"] == len(records)
+    assert summary["peak_routes"] == sum(r["IsPeak"] for r in records)
+    assert summary["unique_drivers"] == len({r["Driver ID"] for r in records})
+
+@pytest.mark.parametrize("fmt", main.EXPORT_FORMATS)
+def test_export_empty_schedule_keeps_header(tmp_path, fmt):
+    if fmt != "csv":
+        pytest.importorskip("pyarrow")
+    path = tmp_path / f"empty.{fmt}"
+    main.export_schedule(iter(()), main.datetime(2024, 1, 1), str(path), fmt)
+    back = read_csv(path) if fmt == "csv" else read_arrow(path, fmt)
+    assert back == []
+    if fmt == "csv":
+        assert path.read_text(encoding="utf-8") == ",".join(main.CSV_COLUMNS) + "\n"
+
+def test_format_from_extension():
+    assert main.export_format_for("x.PQ") == "parquet"
+    assert main.export_format_for("x.feather") == "arrow"
+    assert main.export_format_for("x.txt") == "csv"
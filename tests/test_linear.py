@@ -0,0 +1,28 @@
+import random
+
+import main
+
+def test_driver_index_offers_exactly_the_free_drivers():
+    rng = random.Random(0)
+    for day_idx in range(3):
+        _, drivers = main.day_fleet(3, 40)
+        index = main.DriverIndex(drivers, day_idx)
+        now = 0
+        for _ in range(200):
+            now += rng.randint(0, 20)
+            index.release(now)
+            free = {drv.driver_id for drv in drivers
+                    if drv.can_work_this_day(day_idx) and drv.next_free_time <= now
+                    and drv.worked + main.ROUTE_MIN <= drv.limit_min}
+            offered = [drv.driver_id for drv in index.candidates(rng)]
+            assert len(offered) == len(set(offered)) and set(offered) == free
+            if offered:
+                drv = next(d for d in drivers if d.driver_id == offered[0])
+                drv.worked += 60
+                drv.next_free_time = now + rng.randint(1, 90)
+                index.touch(drv)
+
+def test_linear_large_fleet_is_valid():
+    rows = main.build_days_rows(main.linear_day_rows, 40, 400, 3, seed=5)
+    schedule = main.Schedule.from_rows(rows, main.datetime(2024, 1, 1), days=3)
+    assert len(schedule) and main.violation_count(schedule) == 0
@@ -0,0 +1,40 @@
+import random
+from datetime import datetime
+
+import main
+
+BASE = datetime(2024, 1, 1)
+
+def linear_week(seed):
+    rows = main.build_days_rows(main.linear_day_rows, 5, 12, 7, seed=seed)
+    return main.Schedule.from_rows(rows, BASE)
+
+def test_repaired_mutate_keeps_schedule_valid():
+    for i in range(20):
+        schedule = linear_week(i)
+        rng = random.Random(i)
+        for _ in range(300):
+            main.mutate(schedule, 5, 12, mutation_rate=1.0, rng=rng)
+        assert main.violation_count(schedule) == 0
+
+def test_repaired_deletion_keeps_schedule_valid():
+    for i in range(10):
+        schedule = linear_week(i)
+        rng = random.Random(i)
+        for _ in range(100):
+            idx = main.repair_deletion(schedule, rng.randint(0, len(schedule) - 1), rng)
+            if idx is not None:
+                schedule.delete(idx)
+        assert main.violation_count(schedule) == 0
+
+def test_unrepaired_mutate_does_break_rules():
+    # Контроль: без repair те же мутации дают нарушения, иначе тесты выше
+    # ничего не проверяют
+    broken = 0
+    for i in range(5):
+        schedule = linear_week(i)
+        rng = random.Random(i)
+        for _ in range(300):
+            main.mutate(schedule, 5, 12, mutation_rate=1.0, repair=False, rng=rng)
+        broken += main.violation_count(schedule)
+    assert broken > 0
@@ -0,0 +1,65 @@
+import random
+from datetime import datetime
+
+import main
+
+BASE = datetime(2024, 1, 1)
+
+def random_driver_day(rng):
+    # Один водитель, один день, рейсы без пересечений со случайными паузами
+    driver = rng.randint(1, 4)
+    day = driver % 3 if driver % 2 else rng.randint(0, 6)
+    t, intervals = 0, []
+    for _ in range(rng.randint(1, 14)):
+        t += rng.choice([0, 5, 14, 15, 16, 40, 60, 61])
+        dur = rng.randint(main.ROUTE_MIN, main.ROUTE_MAX)
+        intervals.append((t, t + dur))
+        t += dur
+    rows = [(day, s, e, k + 1, driver, main.driver_type_of(driver), False)
+            for k, (s, e) in enumerate(intervals)]
+    return driver, intervals, main.Schedule.from_rows(rows, BASE)
+
+def test_rest_and_hours_match_reference_checks():
+    rng = random.Random(0)
+    for _ in range(2000):
+        driver, intervals, schedule = random_driver_day(rng)
+        d_type = main.driver_type_of(driver)
+        counts = main.validate_schedule(schedule)
+        limit = (main.WORK_HOURS_A if d_type == main.DRIVER_TYPE_A else main.WORK_HOURS_B) * 60
+        assert (counts["driver_rest"] == 0) == main.driver_rest_ok(intervals, d_type)
+        assert (counts["driver_hours"] == 0) == (sum(e - s for s, e in intervals) <= limit)
+        assert counts["driver_overlap"] == counts["day_off"] == 0
+
+def test_generated_schedules_are_valid():
+    for seed in range(5):
+        rows = main.build_days_rows(main.linear_day_rows, 6, 15, 7, seed=seed)
+        linear = main.Schedule.from_rows(rows, BASE)
+        assert main.violation_count(linear) == 0
+        assert main.violation_count(main.valid_week_schedule("2024-01-01", 6, 15,
+                                                             seed=seed)) == 0
+
+def test_each_rule_reports_offending_rows():
+    A, B = main.DRIVER_TYPE_A, main.DRIVER_TYPE_B
+    rows = [
+        (0, 0, 60, 1, 2, A, False),
+        (0, 30, 90, 2, 2, A, False),      # водитель 2 ещё в рейсе
+        (0, 100, 160, 3, 4, A, False),
+        (0, 170, 230, 3, 6, A, False),    # автобус 3: разворот 10 минут
+        (0, 200, 260, 1, 8, A, False),
+        (0, 220, 280, 1, 10, A, False),   # автобус 1 ещё в рейсе
+        (1, 0, 60, 4, 3, B, False),       # B с id 3 работает в дни 0, 3, 6
+    ]
+    counts, offending = main.validate_schedule(main.Schedule.from_rows(rows, BASE),
+                                               with_rows=True)
+    assert offending["driver_overlap"].tolist() == [1]
+    assert offending["bus_turnaround"].tolist() == [3]
+    assert offending["bus_overlap"].tolist() == [5]
+    assert offending["day_off"].tolist() == [6]
+    assert counts["driver_hours"] == counts["driver_rest"] == 0
+
+def test_penalty_lowers_fitness(monkeypatch):
+    rows = [(0, 0, 60, 1, 2, main.DRIVER_TYPE_A, False),
+            (0, 30, 90, 2, 2, main.DRIVER_TYPE_A, False)]
+    clean = main.evaluate_schedule(main.Schedule.from_rows(rows, BASE))
+    monkeypatch.setattr(main, "VIOLATION_PENALTY", 10.0)
+    assert main.evaluate_schedule(main.Schedule.from_rows(rows, BASE)) == clean - 10.0
@@ -0,0 +1,33 @@
+import random
+
+import numpy as np
+
+import main
+
+def test_warm_start_population_is_valid():
+    for seed in range(5):
+        population = main.warm_start_population("2024-01-01", 5, 12, 10,
+                                                rng=random.Random(seed))
+        assert len(population) == 10
+        assert [main.violation_count(ind) for ind in population] == [0] * 10
+
+def test_store_keeps_best_and_skips_invalid(tmp_path):
+    store = main.ScheduleStore(str(tmp_path), keep=2)
+    population = main.warm_start_population("2024-01-01", 5, 12, 3,
+                                            rng=random.Random(0))
+    broken = population[0].take(np.arange(len(population[0])))
+    broken.driver[:] = 1     # один водитель на все рейсы -- пересечения
+    broken.dtype[:] = 1
+    broken.fitness = None
+    store.save(5, 12, main.WEEK_DAYS, population + [broken])
+
+    loaded = store.load(5, 12, main.WEEK_DAYS, population[0].base_date)
+    assert len(loaded) == 2
+    fits = [main.evaluate_schedule(ind) for ind in loaded]
+    assert fits == sorted(fits, reverse=True)
+    # у сломанной особи фитнес выше (один водитель), она среди сохранённых
+    assert any(main.violation_count(ind) for ind in loaded)
+
+    warm = main.warm_start_population("2024-01-08", 5, 12, 4, store=store,
+                                      rng=random.Random(1))
+    assert all(main.violation_count(ind) == 0 for ind in warm)